@@ -0,0 +1,5 @@
+"""
+Benchmarks of the game hot paths.
+The suite runs from the repository root: python -m benchmarks.suite --help
+The bench_*.py scripts are standalone and can be run directly.
+"""
@@ -0,0 +1,37 @@
+"""
+Stress the flood fill on a huge, almost empty board.
+The first click opens nearly every cell, which overflowed the recursion limit
+with the recursive implementation.
+Run from the repository root: python benchmarks/bench_flood_fill.py
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from board import Board, REVEALED  # noqa: E402
+
+WIDTH = 2000
+HEIGHT = 2000
+MINES = 20
+
+
+def main():
+    board = Board(WIDTH, HEIGHT, MINES)
+    board.place_mines(WIDTH // 2, HEIGHT // 2)
+
+    start = time.perf_counter()
+    hit, revealed = board.reveal_cell(WIDTH // 2, HEIGHT // 2)
+    elapsed = time.perf_counter() - start
+
+    opened = sum(1 for cell in board.state if cell & REVEALED)
+    assert not hit
+    assert opened == len(revealed) == len(set(revealed))
+    assert opened <= board.size - MINES
+    print(f"{WIDTH}x{HEIGHT}, {MINES} mines: revealed {opened} cells in {elapsed:.2f}s "
+          f"({opened / elapsed / 1e6:.2f}M cells/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,62 @@
+"""
+Compare board generation against the original rejection-sampling implementation.
+Run from the repository root: python benchmarks/bench_generation.py
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from board import Board, MINED  # noqa: E402
+
+# (label, width, height, mines, repeats)
+CASES = [
+    ("Expert 30x16", 30, 16, 99, 200),
+    ("1000x1000", 1000, 1000, 206250, 1),
+]
+
+
+def legacy_place_mines(board, safe_x, safe_y):
+    """The placement used before the Board engine: rejection sampling and per-cell counts."""
+    state = board.state
+    mines_to_place = board.mines_count
+    safe_zone = {
+        (safe_x + dx, safe_y + dy) for dx in range(-1, 2) for dy in range(-1, 2)
+    }
+    while mines_to_place > 0:
+        x = random.randint(0, board.width - 1)
+        y = random.randint(0, board.height - 1)
+        index = y * board.width + x
+        if (x, y) not in safe_zone and not state[index] & MINED:
+            state[index] |= MINED
+            mines_to_place -= 1
+
+    for y in range(board.height):
+        for x in range(board.width):
+            board.mines_around[y * board.width + x] = board.count_mines_around(x, y)
+    board.mines_placed = True
+
+
+def measure(place, width, height, mines, repeats):
+    """Return the mean time of one placement in seconds."""
+    total = 0.0
+    for _ in range(repeats):
+        board = Board(width, height, mines)
+        start = time.perf_counter()
+        place(board, width // 2, height // 2)
+        total += time.perf_counter() - start
+    return total / repeats
+
+
+def main():
+    print(f"{'board':<14}{'legacy':>12}{'current':>12}{'speedup':>10}")
+    for label, width, height, mines, repeats in CASES:
+        legacy = measure(legacy_place_mines, width, height, mines, repeats)
+        current = measure(Board.place_mines, width, height, mines, repeats)
+        print(f"{label:<14}{legacy * 1000:>10.2f}ms{current * 1000:>10.2f}ms{legacy / current:>9.1f}x")
+
+
+if __name__ == "__main__":
+    main()
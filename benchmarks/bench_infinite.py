@@ -0,0 +1,53 @@
+"""
+Explore an unbounded board further and further from the origin and check that
+memory stays bounded while the chunks the player touched are evicted to disk.
+Run from the repository root: python benchmarks/bench_infinite.py
+"""
+import os
+import random
+import sys
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from infinite import InfiniteBoard, CHUNK_SIZE  # noqa: E402
+
+CLICKS = 20000
+MAX_CHUNKS = 64
+# Every click lands this many cells further from the origin
+STEP = 7
+
+
+def main():
+    rng = random.Random(0)
+    board = InfiniteBoard(seed=1, max_chunks=MAX_CHUNKS)
+    tracemalloc.start()
+    start = time.perf_counter()
+    board.reveal_cell(0, 0)
+    peaks = []
+    for click in range(1, CLICKS + 1):
+        x = click * STEP
+        y = rng.randrange(-CHUNK_SIZE * 4, CHUNK_SIZE * 4)
+        if not board.is_mined(x, y):
+            board.reveal_cell(x, y)
+        else:
+            board.toggle_flag(x, y)
+        if click % (CLICKS // 4) == 0:
+            current, _ = tracemalloc.get_traced_memory()
+            peaks.append(current)
+            print(f"{click:>6} clicks, x = {x:>7}: {len(board.chunks):>3} chunks loaded, "
+                  f"{current / 1024:8.0f} KB traced")
+    elapsed = time.perf_counter() - start
+    tracemalloc.stop()
+
+    size = os.path.getsize(board.store_path)
+    board.close()
+    print(f"{CLICKS / elapsed:.0f} clicks/s, {board.revealed_count} cells revealed, store {size / 1024:.0f} KB")
+    assert len(board.chunks) <= MAX_CHUNKS
+    # Memory must not grow with the explored distance
+    assert peaks[-1] < peaks[0] * 1.5
+
+
+if __name__ == "__main__":
+    main()
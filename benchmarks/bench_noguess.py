@@ -0,0 +1,39 @@
+"""
+Measure the no-guess generator on every difficulty preset of the menu.
+Run from the repository root: python benchmarks/bench_noguess.py [boards per preset]
+"""
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from noguess import NoGuessGenerator  # noqa: E402
+from topbar import PRESETS  # noqa: E402
+from topology import SQUARE  # noqa: E402
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 20
+    generator = NoGuessGenerator()
+    try:
+        # Start the workers before timing
+        generator.generate(9, 9, 10, 4, 4)
+        generator.stats.clear()
+        for label, width, height, mines_count in PRESETS:
+            start = time.perf_counter()
+            for _ in range(count):
+                generator.generate(width, height, mines_count, width // 2, height // 2)
+            elapsed = time.perf_counter() - start
+            report = generator.report()[(width, height, mines_count, SQUARE)]
+            print(
+                f"{label:24} {count / elapsed:8.1f} accepted/s "
+                f"{report['boards_per_second']:8.1f} boards/s "
+                f"{report['rejection_rate']:6.1%} rejected"
+            )
+    finally:
+        generator.close()
+
+
+if __name__ == "__main__":
+    main()
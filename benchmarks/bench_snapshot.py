@@ -0,0 +1,98 @@
+"""
+Time and size the copy-on-write board snapshots: an undo history of a long game,
+and many what-if branches played from one position, against full board copies.
+Run from the repository root: python benchmarks/bench_snapshot.py [size] [branches]
+"""
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from board import Board, MINED, REVEALED  # noqa: E402
+from snapshot import History  # noqa: E402
+
+ACTIONS = 500
+
+
+def play(board, rng):
+    """Play one random action: flag a hidden mine, or reveal a hidden safe cell."""
+    while True:
+        index = rng.randrange(board.size)
+        cell = board.state[index]
+        if not cell & REVEALED:
+            x, y = board.coords(index)
+            if cell & MINED:
+                board.toggle_flag(x, y)
+            else:
+                board.reveal_cell(x, y)
+            return
+
+
+def full_copy_bytes(board):
+    """Bytes of a plain copy of the buffers a snapshot holds."""
+    return 3 * board.size
+
+
+def bench_history(board, rng):
+    """Play a game keeping every state, then walk the whole history back and forth."""
+    history = History(board.snapshot())
+    start = time.perf_counter()
+    for _ in range(ACTIONS):
+        play(board, rng)
+        history.push(board.snapshot(history.current))
+    taken = time.perf_counter() - start
+    snapshots = history.undo_stack
+    memory = snapshots[0].memory_bytes() + sum(
+        snapshot.memory_bytes(base) for base, snapshot in zip(snapshots, snapshots[1:])
+    )
+
+    start = time.perf_counter()
+    while history.undo() is not None:
+        board.restore(history.current)
+    undone = time.perf_counter() - start
+    start = time.perf_counter()
+    while history.redo() is not None:
+        board.restore(history.current)
+    redone = time.perf_counter() - start
+    print(
+        f"history of {len(snapshots)} states: action + snapshot {taken / ACTIONS * 1e6:.0f} us, "
+        f"undo {undone / ACTIONS * 1e6:.0f} us, redo {redone / ACTIONS * 1e6:.0f} us, "
+        f"{memory / 1e6:.1f} MB against {len(snapshots) * full_copy_bytes(board) / 1e6:.0f} MB of copies"
+    )
+
+
+def bench_branches(board, rng, count):
+    """Explore many continuations of a few actions each from one position."""
+    root = board.snapshot()
+    branches = []
+    start = time.perf_counter()
+    for _ in range(count):
+        board.restore(root)
+        for _ in range(3):
+            play(board, rng)
+        branches.append(board.snapshot(root))
+    elapsed = time.perf_counter() - start
+    board.restore(root)
+    memory = sum(branch.memory_bytes(root) for branch in branches)
+    print(
+        f"{count} branches of 3 actions: {elapsed / count * 1e6:.0f} us each, "
+        f"{memory / 1e6:.1f} MB against {count * full_copy_bytes(board) / 1e6:.0f} MB of copies"
+    )
+
+
+def main():
+    size = int(sys.argv[1]) if len(sys.argv) > 1 else 1000
+    count = int(sys.argv[2]) if len(sys.argv) > 2 else 1000
+    rng = random.Random(1)
+    board = Board(size, size, size * size // 5, seed=1)
+    board.place_mines(size // 2, size // 2)
+    board.reveal_cell(size // 2, size // 2)
+    print(f"{size}x{size}, {board.mines_count} mines")
+    bench_history(board, rng)
+    bench_branches(board, rng, count)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Measure the cold start of the game in fresh interpreters, and fail when it goes
+over budget or when a module only some games need is imported at startup.
+Import times come from -X importtime. The first window is timed through the real
+entry point, `python game.py` with a fresh statistics database, under Xvfb when
+there is no display; it is skipped if Xvfb is not installed.
+Run from the repository root: python benchmarks/bench_startup.py [--budget MS]
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.display import virtual_display  # noqa: E402
+
+# Modules imported where they are used, never by `import game`
+LAZY_MODULES = ["PIL", "sqlite3", "multiprocessing", "concurrent.futures", "cProfile", "noguess", "stats",
+                "instrument"]
+
+# Run in a fresh interpreter: run game.py as `python game.py` does, until its event
+# loop starts; then paint the window, run what is scheduled once it shows, e.g.
+# opening the statistics, and report the timings
+WINDOW_SCRIPT = """
+import runpy, sys, time, tkinter
+start = time.perf_counter()
+times = []
+
+def mainloop(self, n=0):
+    times.append(time.perf_counter())
+    self.update()
+    times.append(time.perf_counter())
+
+tkinter.Misc.mainloop = mainloop
+sys.argv = [{path!r}, "--stats", {stats!r}]
+window = runpy.run_path({path!r}, run_name="__main__")["game"]
+print(times[0] - start, times[1] - times[0], window.grid.renderer.sprites.stats()["from_bundle"])
+window.destroy()
+"""
+
+
+def import_times(runs):
+    """
+    Import the game in fresh interpreters.
+    :return: Tuple (cumulative import time of every run in ms, self times of the slowest modules of the last run)
+    """
+    totals = []
+    modules = {}
+    for _ in range(runs):
+        output = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", "import game"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stderr
+        modules = {}
+        for line in output.splitlines():
+            if not line.startswith("import time:") or "|" not in line or "self [us]" in line:
+                continue
+            own, cumulative, name = line[len("import time:"):].split("|")
+            modules[name.strip()] = int(own)
+            if name.strip() == "game":
+                totals.append(int(cumulative) / 1000)
+    return totals, sorted(modules.items(), key=lambda item: -item[1])[:8]
+
+
+def lazy_imports():
+    """Return the modules of LAZY_MODULES that `import game` imports."""
+    output = subprocess.run(
+        [sys.executable, "-c", f"import sys, game; print(' '.join(m for m in {LAZY_MODULES!r} if m in sys.modules))"],
+        cwd=ROOT, capture_output=True, text=True, check=True,
+    ).stdout
+    return output.split()
+
+
+def window_times(runs):
+    """
+    Open the first window in fresh interpreters, from another working directory.
+    :return: List of (s until the event loop, s to paint and open the statistics, sprites from bundle)
+        per run, None without a display
+    """
+    xvfb = virtual_display()
+    if xvfb is False:
+        return None
+    environment = dict(os.environ, PYTHONPATH=ROOT)
+    try:
+        results = []
+        for _ in range(runs):
+            with tempfile.TemporaryDirectory() as directory:
+                script = WINDOW_SCRIPT.format(path=os.path.join(ROOT, "game.py"),
+                                              stats=os.path.join(directory, "stats.sqlite"))
+                output = subprocess.run(
+                    [sys.executable, "-c", script],
+                    cwd=os.path.expanduser("~"), env=environment, capture_output=True, text=True, check=True,
+                ).stdout.split()
+            results.append((float(output[0]), float(output[1]), output[2] == "True"))
+        return results
+    finally:
+        if xvfb is not None:
+            xvfb.terminate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Startup time of the game")
+    parser.add_argument("--runs", type=int, default=10, help="fresh interpreters started")
+    parser.add_argument("--budget", type=float, default=100.0, help="median milliseconds allowed to first window")
+    args = parser.parse_args()
+
+    failures = []
+    totals, slowest = import_times(args.runs)
+    imported = statistics.median(totals)
+    print(f"import game: median {imported:.1f} ms, min {min(totals):.1f} ms")
+    print("slowest modules:", ", ".join(f"{name} {own / 1000:.1f} ms" for name, own in slowest))
+
+    eager = lazy_imports()
+    if eager:
+        failures.append(f"imported at startup: {', '.join(eager)}")
+
+    total = imported
+    windows = window_times(args.runs)
+    if windows is None:
+        print("no display and no Xvfb, first window skipped")
+    else:
+        started = statistics.median(start for start, _, _ in windows) * 1000
+        shown = statistics.median(window for _, window, _ in windows) * 1000
+        total = statistics.median((start + window) for start, window, _ in windows) * 1000
+        print(f"python game.py: median {started:.1f} ms to the event loop, {shown:.1f} ms to paint and open "
+              f"the statistics, {total:.1f} ms in all")
+        if not all(bundle for _, _, bundle in windows):
+            failures.append("sprites not loaded from the bundle")
+
+    if total > args.budget:
+        failures.append(f"startup {total:.1f} ms over the {args.budget:.0f} ms budget")
+    for failure in failures:
+        print("FAILED:", failure)
+    if failures:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+"""
+Fill a statistics store with many games, then time recording and the queries
+behind the topbar and the leaderboard.
+Run from the repository root: python benchmarks/bench_stats.py [games]
+"""
+import os
+import random
+import sys
+import tempfile
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from board import Board  # noqa: E402
+from stats import StatsStore  # noqa: E402
+from topbar import PRESETS  # noqa: E402
+from topology import TOPOLOGIES  # noqa: E402
+
+QUERIES = 1000
+
+
+def fill(store, count):
+    """Queue random results on every preset and topology, and return the rate they are written at."""
+    rng = random.Random(1)
+    presets = [(width, height, mines_count, topology)
+               for _, width, height, mines_count in PRESETS for topology in TOPOLOGIES]
+    start = time.perf_counter()
+    for _ in range(count):
+        width, height, mines_count, topology = rng.choice(presets)
+        won = rng.random() < 0.4
+        store.add(topology, width, height, mines_count, rng.randrange(1 << 62), False, won,
+                  rng.randrange(1000, 600000), rng.randrange(1, width * height // 2), rng.randrange(1, 500))
+    queued = time.perf_counter() - start
+    store.flush()
+    written = time.perf_counter() - start
+    return queued, written
+
+
+def main():
+    count = int(sys.argv[1]) if len(sys.argv) > 1 else 1000000
+    with tempfile.TemporaryDirectory() as directory:
+        path = os.path.join(directory, "stats.sqlite")
+        store = StatsStore(path)
+        queued, written = fill(store, count)
+        print(f"{count} games queued in {queued:.2f}s, written in {written:.2f}s: {count / written:.0f} games/s, "
+              f"{os.path.getsize(path) / 1e6:.1f} MB")
+
+        # A real game, whose 3BV the writer thread computes
+        board = Board(30, 16, 99, seed=1)
+        board.place_mines(15, 8)
+        start = time.perf_counter()
+        store.record(board, True, 12345, 200)
+        recorded = time.perf_counter() - start
+        store.flush()
+        print(f"record on the UI thread {recorded * 1e6:.0f} us")
+
+        # A fresh store reads its summaries from disk, as at startup
+        store.close()
+        store = StatsStore(path)
+        _, width, height, mines_count = PRESETS[-1]
+        key = (width, height, mines_count, TOPOLOGIES[0])
+        start = time.perf_counter()
+        store.summary(*key)
+        cold = time.perf_counter() - start
+        warm = timeit.timeit(lambda: store.summary(*key), number=QUERIES) / QUERIES
+        best = timeit.timeit(lambda: store.best_times(*key), number=QUERIES) / QUERIES
+        print(f"summary cold {cold * 1000:.3f} ms warm {warm * 1000:.4f} ms, best times {best * 1000:.3f} ms")
+        plan = store.connection.execute(
+            "EXPLAIN QUERY PLAN SELECT duration_ms FROM games"
+            " WHERE width = ? AND height = ? AND mines = ? AND topology = ? AND won = 1 AND assisted = 0"
+            " ORDER BY duration_ms LIMIT 10",
+            key,
+        ).fetchall()
+        print("best times plan:", "; ".join(row[-1] for row in plan))
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,92 @@
+"""
+Compare the neighborhood queries of the topologies with the dx/dy loops they
+replaced, and time creating a board and playing on every topology, with the
+memory of the hex tables.
+Run from the repository root: python benchmarks/bench_topology.py
+"""
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from board import Board, MINED  # noqa: E402
+from topbar import PRESETS  # noqa: E402
+from topology import TOPOLOGIES, clear_topologies  # noqa: E402
+
+QUERIES = 100000
+LARGE = 1000
+
+
+def loop_neighbors(width, height, x, y):
+    """The bounds-checked double loop used before topology.py."""
+    indices = []
+    for dx in range(-1, 2):
+        for dy in range(-1, 2):
+            nx, ny = x + dx, y + dy
+            if 0 <= nx < width and 0 <= ny < height:
+                indices.append(ny * width + nx)
+    return indices
+
+
+def bench_queries(label, width, height, mines_count, kind=TOPOLOGIES[0]):
+    """Time neighbor lookups and mine counts with the loop and with the topology."""
+    board = Board(width, height, mines_count, seed=1, topology=kind)
+    board.place_mines(width // 2, height // 2)
+    topology = board.topology
+    state = board.state
+    rng = random.Random(1)
+    cells = [(rng.randrange(width), rng.randrange(height)) for _ in range(QUERIES)]
+    indices = [y * width + x for x, y in cells]
+
+    timings = {
+        "neighbors loop": lambda: [loop_neighbors(width, height, x, y) for x, y in cells],
+        "neighbors topology": lambda: [topology.neighbors(index) for index in indices],
+        "count loop": lambda: [
+            sum(1 for i in loop_neighbors(width, height, x, y) if state[i] & MINED) for x, y in cells
+        ],
+        "count topology": lambda: [
+            sum(1 for i in topology.neighbors(index) if state[i] & MINED) for index in indices
+        ],
+    }
+    results = {name: min(timeit.repeat(function, number=1, repeat=3)) for name, function in timings.items()}
+    print(
+        f"{label:24} {kind:7} neighbors {results['neighbors loop'] / QUERIES * 1e9:6.0f} -> "
+        f"{results['neighbors topology'] / QUERIES * 1e9:4.0f} ns  "
+        f"count {results['count loop'] / QUERIES * 1e9:6.0f} -> "
+        f"{results['count topology'] / QUERIES * 1e9:4.0f} ns"
+    )
+
+
+def bench_topologies(size):
+    """Time creating a board, generating it and a first click on each topology."""
+    mines_count = size * size // 10
+    for kind in TOPOLOGIES:
+        clear_topologies()
+        start = time.perf_counter()
+        board = Board(size, size, mines_count, seed=1, topology=kind)
+        created = time.perf_counter() - start
+        start = time.perf_counter()
+        board.place_mines(size // 2, size // 2)
+        generated = time.perf_counter() - start
+        start = time.perf_counter()
+        _, revealed = board.reveal_cell(size // 2, size // 2)
+        opened = time.perf_counter() - start
+        print(
+            f"{size}x{size} {kind:7} board {created * 1000:6.1f} ms  tables {board.topology.nbytes / 1e6:6.1f} MB  "
+            f"generate {generated * 1000:7.1f} ms  first click {len(revealed):7} cells {opened * 1000:7.1f} ms"
+        )
+
+
+def main():
+    for label, width, height, mines_count in PRESETS:
+        bench_queries(label, width, height, mines_count)
+    for kind in TOPOLOGIES:
+        bench_queries(f"{LARGE}x{LARGE}", LARGE, LARGE, LARGE * LARGE // 10, kind)
+    bench_topologies(LARGE)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,33 @@
+import os
+import shutil
+import subprocess
+
+
+def virtual_display():
+    """
+    Make sure Tk has a display, starting Xvfb when there is none.
+    :return: The Xvfb process to terminate once done, None if a display was already
+        available, False if there is no display and Xvfb is not installed
+    """
+    if os.environ.get("DISPLAY") or os.name == "nt":
+        return None
+    xvfb = shutil.which("Xvfb")
+    if xvfb is None:
+        return False
+
+    # Xvfb picks a free display number and writes it to the given descriptor
+    read_fd, write_fd = os.pipe()
+    process = subprocess.Popen(
+        [xvfb, "-displayfd", str(write_fd), "-screen", "0", "1920x1080x24", "-nolisten", "tcp"],
+        pass_fds=(write_fd,),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    os.close(write_fd)
+    with os.fdopen(read_fd) as pipe:
+        number = pipe.readline().strip()
+    if not number:
+        process.terminate()
+        return False
+    os.environ["DISPLAY"] = f":{number}"
+    return process
@@ -0,0 +1,147 @@
+"""
+Load the game server with many simultaneous sessions.
+A server is started on a free port unless --port is given. Every session connects
+first, then they all play at once, each waiting for its reply before its next action.
+Run from the repository root: python benchmarks/loadgen.py --sessions 2000
+"""
+import argparse
+import asyncio
+import os
+import random
+import subprocess
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+from benchmarks.measure import percentile  # noqa: E402
+from protocol import (  # noqa: E402
+    NEW, REVEAL, FLAG, STARTED, DELTA, NEW_GAME, CELL, PLAYING, apply_delta, frame, read_frame,
+)
+from server import raise_open_files_limit  # noqa: E402
+from spritecodes import BUTTON  # noqa: E402
+from topology import TOPOLOGIES  # noqa: E402
+
+# Share of the actions that toggle a flag instead of revealing
+FLAG_RATE = 0.1
+# Connections opened at once while the sessions connect
+CONNECT_BATCH = 256
+
+
+class Player:
+    def __init__(self, number, width, height, mines_count, topology):
+        """
+        Initialize a client playing random moves, keeping its copy of the board from
+        the deltas it receives.
+        :param number: Number of the player, seeds its moves and boards
+        """
+        self.rng = random.Random(number)
+        self.width = width
+        self.height = height
+        self.mines_count = mines_count
+        self.topology = TOPOLOGIES.index(topology)
+        self.shown = bytearray(width * height)
+        self.status = PLAYING
+        self.reader = self.writer = None
+        # Latency of every request in seconds, and bytes received
+        self.latencies = []
+        self.received = 0
+
+    async def connect(self, host, port):
+        self.reader, self.writer = await asyncio.open_connection(host, port)
+
+    async def request(self, kind, payload=b""):
+        """Send a request and wait for its reply."""
+        start = time.perf_counter()
+        self.writer.write(frame(kind, payload))
+        await self.writer.drain()
+        reply, data = await read_frame(self.reader)
+        self.latencies.append(time.perf_counter() - start)
+        self.received += len(data)
+        return reply, data
+
+    async def new_game(self):
+        seed = self.rng.randrange(1 << 62)
+        reply, _ = await self.request(NEW, NEW_GAME.pack(self.width, self.height, self.mines_count, self.topology, seed))
+        if reply != STARTED:
+            raise RuntimeError("The server refused the game")
+        self.shown[:] = bytes(len(self.shown))
+        self.status = PLAYING
+
+    async def play(self, actions):
+        """Play a number of actions, starting a new game whenever one ends."""
+        await self.new_game()
+        for _ in range(actions):
+            hidden = [index for index, code in enumerate(self.shown) if code == BUTTON]
+            if self.status != PLAYING or not hidden:
+                await self.new_game()
+                continue
+            x, y = divmod(self.rng.choice(hidden), self.width)[::-1]
+            kind = FLAG if self.rng.random() < FLAG_RATE else REVEAL
+            reply, data = await self.request(kind, CELL.pack(x, y))
+            if reply != DELTA:
+                raise RuntimeError(data.decode())
+            self.status, _, _ = apply_delta(data, self.shown)
+
+    def close(self):
+        self.writer.close()
+
+
+async def run(host, port, sessions, actions, width, height, mines_count, topology):
+    """Connect every player, then play them all at once."""
+    players = [Player(number, width, height, mines_count, topology) for number in range(sessions)]
+    start = time.perf_counter()
+    for first in range(0, sessions, CONNECT_BATCH):
+        await asyncio.gather(*(player.connect(host, port) for player in players[first:first + CONNECT_BATCH]))
+    connected = time.perf_counter() - start
+    print(f"{sessions} sessions connected in {connected:.2f}s")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(player.play(actions) for player in players))
+    elapsed = time.perf_counter() - start
+    for player in players:
+        player.close()
+
+    latencies = sorted(latency for player in players for latency in player.latencies)
+    received = sum(player.received for player in players)
+    print(
+        f"{len(latencies)} requests in {elapsed:.2f}s: {len(latencies) / elapsed:.0f} requests/s, "
+        f"latency p50 {percentile(latencies, 0.5) * 1000:.2f} ms p99 {percentile(latencies, 0.99) * 1000:.2f} ms, "
+        f"{received / len(latencies):.1f} bytes per reply"
+    )
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load generator for server.py")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, help="port of a running server, one is started if omitted")
+    parser.add_argument("--sessions", type=int, default=2000)
+    parser.add_argument("--actions", type=int, default=50, help="actions per session")
+    parser.add_argument("--size", default="16x16", help="board size as WIDTHxHEIGHT")
+    parser.add_argument("--mines", type=int, default=40)
+    parser.add_argument("--topology", choices=TOPOLOGIES, default=TOPOLOGIES[0])
+    args = parser.parse_args()
+    width, height = map(int, args.size.lower().split("x"))
+
+    raise_open_files_limit()
+    server = None
+    port = args.port
+    if port is None:
+        server = subprocess.Popen(
+            [sys.executable, os.path.join(ROOT, "server.py"), "--host", args.host, "--port", "0", "--stats", "3600"],
+            stdout=subprocess.PIPE, text=True,
+        )
+        port = int(server.stdout.readline().rsplit(":", 1)[1])
+    try:
+        asyncio.run(run(args.host, port, args.sessions, args.actions, width, height, args.mines, args.topology))
+    finally:
+        if server is not None:
+            server.terminate()
+            server.wait()
+            times = os.times()
+            print(f"server CPU time {times.children_user + times.children_system:.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,80 @@
+import gc
+import sys
+import time
+import tracemalloc
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+
+def percentile(samples, fraction):
+    """
+    Read a percentile from sorted samples, by nearest rank.
+    :param samples: Sorted list of samples
+    :param fraction: Percentile between 0 and 1
+    :return: The sample at that rank
+    """
+    rank = min(len(samples) - 1, max(0, round(fraction * len(samples) + 0.5) - 1))
+    return samples[rank]
+
+
+def peak_rss_kb():
+    """Return the peak resident set size of the process in KB, None if unknown."""
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # macOS reports bytes, Linux reports KB
+    return peak // 1024 if sys.platform == "darwin" else peak
+
+
+def measure(setup, operation, repeats, budget=2.0, inner=1):
+    """
+    Time an operation, then run it once more with allocation tracing.
+    :param setup: Function taking the repeat number and returning the operation argument,
+        its time is not measured
+    :param operation: Function taking the setup result
+    :param repeats: Maximum number of timed runs
+    :param budget: Seconds after which no new run is started, past the third one
+    :param inner: Calls of the operation per run, for operations too fast to time alone
+    :return: Dict of latency percentiles in microseconds, allocations and peak RSS
+    """
+    samples = []
+    deadline = time.perf_counter() + budget
+    gc_was_enabled = gc.isenabled()
+    for repeat in range(repeats):
+        argument = setup(repeat)
+        gc.disable()
+        start = time.perf_counter_ns()
+        for _ in range(inner):
+            operation(argument)
+        elapsed = time.perf_counter_ns() - start
+        if gc_was_enabled:
+            gc.enable()
+        samples.append(elapsed / inner / 1000)
+        if repeat >= 2 and time.perf_counter() > deadline:
+            break
+
+    # Tracing slows everything down, so it gets a run of its own
+    argument = setup(0)
+    gc.collect()
+    tracemalloc.start()
+    blocks = sys.getallocatedblocks()
+    operation(argument)
+    blocks = sys.getallocatedblocks() - blocks
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    samples.sort()
+    return {
+        "runs": len(samples),
+        "p50_us": percentile(samples, 0.5),
+        "p90_us": percentile(samples, 0.9),
+        "p99_us": percentile(samples, 0.99),
+        "max_us": samples[-1],
+        "mean_us": sum(samples) / len(samples),
+        "allocated_blocks": blocks,
+        "peak_alloc_bytes": peak,
+        "peak_rss_kb": peak_rss_kb(),
+    }
@@ -0,0 +1,221 @@
+"""
+Benchmark board generation, first-click reveal, victory check and rendering on
+the menu presets and on large synthetic boards.
+Run from the repository root:
+    python -m benchmarks.suite --output results.json
+    python -m benchmarks.suite --baseline results.json
+Rendering runs under Xvfb when there is no display; it is skipped if Xvfb is not
+installed.
+"""
+import argparse
+import json
+import platform
+import sys
+import time
+
+from benchmarks.display import virtual_display
+from benchmarks.measure import measure
+from board import Board
+from topbar import PRESETS
+
+# Synthetic square boards, with 10% mines so that first clicks open large areas
+SYNTHETIC_SIZES = [100, 500, 1000, 2000]
+SYNTHETIC_DENSITY = 0.1
+CELL_SIZE = 30
+# Visible area of the rendered boards, larger boards are scrolled
+VIEW_WIDTH = 1600
+VIEW_HEIGHT = 900
+
+
+def cases():
+    """Return the benchmarked boards as (label, width, height, mines)."""
+    boards = list(PRESETS)
+    for size in SYNTHETIC_SIZES:
+        boards.append((f"{size}x{size}", size, size, int(size * size * SYNTHETIC_DENSITY)))
+    return boards
+
+
+def generated(width, height, mines_count, seed):
+    """Build a board with its mines placed from a first click in the center."""
+    board = Board(width, height, mines_count, seed=seed)
+    board.place_mines(width // 2, height // 2)
+    return board
+
+
+def revealed(width, height, mines_count, seed):
+    """Build a board and play its first click."""
+    board = generated(width, height, mines_count, seed)
+    board.reveal_cell(width // 2, height // 2)
+    return board
+
+
+def bench_board(width, height, mines_count, repeats, budget):
+    """Benchmark the headless operations on one board size."""
+    center = (width // 2, height // 2)
+    return {
+        "generate": measure(
+            lambda seed: seed,
+            lambda seed: generated(width, height, mines_count, seed),
+            repeats, budget,
+        ),
+        "reveal": measure(
+            lambda seed: generated(width, height, mines_count, seed),
+            lambda board: board.reveal_cell(*center),
+            repeats, budget,
+        ),
+        "check_victory": measure(
+            lambda seed: revealed(width, height, mines_count, seed),
+            lambda board: board.check_victory(),
+            repeats, budget, inner=1000,
+        ),
+    }
+
+
+def bench_render(app, width, height, mines_count, repeats, budget):
+    """
+    Benchmark drawing a board on a fresh canvas, repainting the cells opened by
+    the first click and scrolling by one cell.
+    """
+    import tkinter as tk
+    from grid import Grid
+
+    view = (min(width * CELL_SIZE, VIEW_WIDTH), min(height * CELL_SIZE, VIEW_HEIGHT))
+
+    def new_grid(seed):
+        frame = tk.Frame(app)
+        grid = Grid(CELL_SIZE, width, height, mines_count)
+        grid.board = generated(width, height, mines_count, seed)
+        return frame, grid
+
+    def draw(argument):
+        frame, grid = argument
+        grid.draw(frame, *view, *[lambda cell, event: None] * 4)
+        app.update_idletasks()
+        frame.destroy()
+
+    def drawn(seed):
+        frame, grid = new_grid(seed)
+        grid.draw(frame, *view, *[lambda cell, event: None] * 4)
+        app.update_idletasks()
+        return frame, grid
+
+    def repaint(argument):
+        frame, grid = argument
+        _, indices = grid.board.reveal_cell(width // 2, height // 2)
+        grid.update_cells(indices)
+        app.update_idletasks()
+        frame.destroy()
+
+    def scroll(argument):
+        frame, grid = argument
+        # One cell diagonally, the pool moves one row and one column of items
+        grid.renderer.canvas.xview_scroll(CELL_SIZE, "units")
+        grid.renderer.canvas.yview_scroll(CELL_SIZE, "units")
+        app.update_idletasks()
+        frame.destroy()
+
+    return {
+        "draw": measure(new_grid, draw, repeats, budget),
+        "repaint": measure(drawn, repaint, repeats, budget),
+        "scroll": measure(drawn, scroll, repeats, budget),
+    }
+
+
+def run(repeats, budget, render, only=None):
+    """
+    Run the suite.
+    :param repeats: Maximum number of runs per operation
+    :param budget: Seconds per operation after which no new run is started
+    :param render: True to include the rendering benchmarks
+    :param only: Labels of the boards to run, all if None
+    :return: Dict "board/operation" -> measurements
+    """
+    results = {}
+    app = None
+    xvfb = None
+    if render:
+        xvfb = virtual_display()
+        if xvfb is False:
+            print("No display and no Xvfb, skipping the rendering benchmarks", file=sys.stderr)
+            render = False
+        else:
+            import tkinter as tk
+            app = tk.Tk()
+            app.withdraw()
+
+    try:
+        for label, width, height, mines_count in cases():
+            if only and label not in only:
+                continue
+            measured = bench_board(width, height, mines_count, repeats, budget)
+            if render:
+                measured.update(bench_render(app, width, height, mines_count, repeats, budget))
+            for operation, result in measured.items():
+                results[f"{label}/{operation}"] = result
+                print(
+                    f"{label:<24}{operation:<15}{result['p50_us']:>12.1f}{result['p90_us']:>12.1f}"
+                    f"{result['p99_us']:>12.1f}{result['allocated_blocks']:>10}{result['peak_rss_kb'] or 0:>10}"
+                )
+    finally:
+        if app is not None:
+            app.destroy()
+        if xvfb:
+            xvfb.terminate()
+    return results
+
+
+def compare(results, baseline, tolerance):
+    """
+    Compare median latencies with a baseline run.
+    :param results: Results of this run
+    :param baseline: Results of the baseline run
+    :param tolerance: Relative slowdown tolerated before reporting a regression
+    :return: List of the regressed "board/operation" keys
+    """
+    regressions = []
+    print(f"\n{'benchmark':<40}{'baseline':>12}{'current':>12}{'ratio':>8}")
+    for key, result in results.items():
+        if key not in baseline:
+            continue
+        before = baseline[key]["p50_us"]
+        after = result["p50_us"]
+        ratio = after / before if before else 1.0
+        regressed = ratio > 1 + tolerance
+        if regressed:
+            regressions.append(key)
+        print(f"{key:<40}{before:>12.1f}{after:>12.1f}{ratio:>7.2f}x{'  REGRESSED' if regressed else ''}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Minesweeper benchmarks")
+    parser.add_argument("--output", help="write the results to this JSON file")
+    parser.add_argument("--baseline", help="compare with the results in this JSON file")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="relative slowdown reported as a regression")
+    parser.add_argument("--repeats", type=int, default=50, help="maximum runs per operation")
+    parser.add_argument("--budget", type=float, default=2.0, help="seconds per operation")
+    parser.add_argument("--no-render", action="store_true", help="skip the rendering benchmarks")
+    parser.add_argument("--only", nargs="*", help="labels of the boards to run, e.g. 100x100")
+    args = parser.parse_args()
+
+    print(f"{'board':<24}{'operation':<15}{'p50 us':>12}{'p90 us':>12}{'p99 us':>12}{'blocks':>10}{'rss KB':>10}")
+    results = run(args.repeats, args.budget, not args.no_render, args.only)
+
+    if args.output:
+        with open(args.output, "w") as file:
+            json.dump({
+                "timestamp": time.time(),
+                "python": platform.python_version(),
+                "platform": platform.platform(),
+                "results": results,
+            }, file, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as file:
+            baseline = json.load(file)["results"]
+        if compare(results, baseline, args.tolerance):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
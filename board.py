@@ -0,0 +1,511 @@
+import random
+import re
+from snapshot import Snapshot, merge, split
+from topology import SQUARE, get_topology
+
+# Bits of a cell in Board.state
+MINED = 1
+REVEALED = 2
+FLAGGED = 4
+QUESTIONED = 8
+
+# Maps a state byte to 1 if the cell is mined, 0 otherwise
+_MINE_TABLE = bytes(state & MINED for state in range(256))
+_MINED_BYTE = re.compile(b"\x01")
+# A revealed mine, with or without a flag or question mark bit
+_EXPLODED_BYTE = re.compile(b"[\x03\x07\x0b\x0f]")
+_CORRECT_FLAG_TABLE = bytes(int(state & (MINED | FLAGGED) == MINED | FLAGGED) for state in range(256))
+_REVEALED_SAFE_TABLE = bytes(int(state & (MINED | REVEALED) == REVEALED) for state in range(256))
+# Tables used by the flood fill to work on whole slices of the board at once
+_EMPTY_TABLE = bytes([1] + [0] * 255)
+_UNOPENED_TABLE = bytes(0 if state & (REVEALED | FLAGGED) else 1 for state in range(256))
+_OPENABLE_TABLE = bytes(0 if state & (REVEALED | MINED | FLAGGED) else 1 for state in range(256))
+_REVEAL_TABLE = bytes(
+    state if state & (REVEALED | MINED | FLAGGED) else state | REVEALED for state in range(256)
+)
+
+
+def count_3bv(topology, mine_map, mines_around):
+    """
+    Count the 3BV of a board: the left clicks needed to clear it without flags or chords.
+    Every opening, a connected area of cells with no mines around, takes one click,
+    and so does every safe cell no opening uncovers.
+    :param topology: Topology of the board
+    :param mine_map: One byte per cell, 1 for a mine
+    :param mines_around: Mines around each cell
+    :return: The 3BV
+    """
+    neighbors = topology.neighbors
+    # Mines count as handled, so the cells left at 0 are the safe cells still to click
+    handled = bytearray(mine_map)
+    clicks = 0
+    position = mines_around.find(0)
+    while position >= 0:
+        if not handled[position]:
+            clicks += 1
+            handled[position] = 1
+            stack = [position]
+            while stack:
+                index = stack.pop()
+                for neighbor in neighbors(index):
+                    if not handled[neighbor]:
+                        handled[neighbor] = 1
+                        if mines_around[neighbor] == 0:
+                            stack.append(neighbor)
+        position = mines_around.find(0, position + 1)
+    return clicks + handled.count(0)
+
+
+class Board:
+    def __init__(self, width, height, mines_count, debug=False, seed=None, layout=None, topology=SQUARE):
+        """
+        Initialize a headless Board holding the whole game state in flat byte buffers.
+        Cell (x, y) is stored at index y * width + x.
+        :param width: Number of cells along the x axis
+        :param height: Number of cells along the y axis
+        :param mines_count: Number of mines to be placed on the board
+        :param debug: Check the running counters against a full recount after each action
+        :param seed: Seed of the mine placement, a random one is drawn for each game if None
+        :param layout: Indices of the mines, to replay an exact board instead of placing mines
+        :param topology: SQUARE, TORUS or HEX, see topology.py
+        """
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.mines_count = mines_count
+        # Neighborhoods of the cells, see topology.py
+        self.topology = get_topology(width, height, topology)
+
+        # One byte of MINED/REVEALED/FLAGGED/QUESTIONED bits per cell
+        self.state = bytearray(self.size)
+        self.mines_around = bytearray(self.size)
+        # Flags in the neighborhood of each cell, kept up to date by toggle_flag
+        self.flags_around = bytearray(self.size)
+
+        # Running counters, so victory and chord checks never scan the board
+        self.flags_count = 0
+        self.correct_flags = 0
+        self.wrong_flags = 0
+        self.hidden_safe = self.size
+        self.mines_placed = False
+        self.debug = debug
+
+        # Seed and first click of the current game, enough to reproduce its board
+        self.fixed_seed = seed
+        self.seed = seed
+        self.first_click = None
+        self.layout = None
+        if layout is not None:
+            self.layout = tuple(layout)
+            self.load_mines(self.layout)
+
+    def index(self, x, y):
+        """Return the flat index of the cell at (x, y)."""
+        return y * self.width + x
+
+    def coords(self, index):
+        """Return the (x, y) coordinates of a flat index."""
+        return index % self.width, index // self.width
+
+    def neighbors(self, x, y):
+        """
+        List the flat indices of the neighborhood of a cell, the cell included: its
+        3x3 block on square and torus boards, or the cell and its 6 neighbors on hex boards.
+        :param x: X coordinate of the cell
+        :param y: Y coordinate of the cell
+        :return: Array of indices inside the board
+        """
+        return self.topology.neighbors(y * self.width + x)
+
+    def is_mined(self, x, y):
+        return bool(self.state[y * self.width + x] & MINED)
+
+    def is_revealed(self, x, y):
+        return bool(self.state[y * self.width + x] & REVEALED)
+
+    def is_flagged(self, x, y):
+        return bool(self.state[y * self.width + x] & FLAGGED)
+
+    def is_questionned(self, x, y):
+        return bool(self.state[y * self.width + x] & QUESTIONED)
+
+    def place_mines(self, safe_x, safe_y):
+        """
+        Randomly place mines on the board, ensuring not to place one in the safe zone.
+        Mines are drawn without replacement in a single sample, so dense boards cost
+        the same as sparse ones.
+        :param safe_x: X coordinate of the safe cell (first clicked cell)
+        :param safe_y: Y coordinate of the safe cell (first clicked cell)
+        """
+        safe_zone = set(self.neighbors(safe_x, safe_y))
+        if self.mines_count > self.size - len(safe_zone):
+            raise ValueError(f"Cannot place {self.mines_count} mines outside the safe zone")
+        if self.seed is None:
+            self.seed = random.randrange(1 << 63)
+        self.first_click = (safe_x, safe_y)
+
+        # The first mines_count + 9 cells of a random permutation always hold enough
+        # cells outside the safe zone, and their order stays uniformly random
+        rng = random.Random(self.seed)
+        picks = rng.sample(range(self.size), min(self.size, self.mines_count + len(safe_zone)))
+        state = self.state
+        placed = 0
+        for index in picks:
+            if placed == self.mines_count:
+                break
+            if index not in safe_zone:
+                state[index] |= MINED
+                placed += 1
+        self._mines_placed()
+
+    def load_mines(self, indices):
+        """
+        Place the mines at explicit indices, e.g. to replay a known board.
+        :param indices: Flat indices of the mined cells
+        """
+        mine_map = bytearray(self.size)
+        for index in indices:
+            mine_map[index] = 1
+        self.load_mine_map(mine_map)
+
+    def load_mine_map(self, mine_map):
+        """
+        Place the mines from a map holding one byte per cell, 1 for a mine.
+        :param mine_map: Bytes-like object of board size
+        """
+        if len(mine_map) != self.size:
+            raise ValueError(f"Mine map holds {len(mine_map)} cells, expected {self.size}")
+        placed = mine_map.count(1)
+        if placed != self.mines_count:
+            raise ValueError(f"Layout holds {placed} mines, expected {self.mines_count}")
+        # MINED is the lowest bit, so OR-ing the map in sets it without touching flags
+        merged = int.from_bytes(self.state, "little") | int.from_bytes(mine_map, "little")
+        self.state[:] = merged.to_bytes(self.size, "little")
+        self._mines_placed()
+
+    def mine_map(self):
+        """Return one byte per cell, 1 for a mine and 0 elsewhere."""
+        return self.state.translate(_MINE_TABLE)
+
+    def bbbv(self):
+        """Return the 3BV of the board, see count_3bv."""
+        return count_3bv(self.topology, self.mine_map(), self.mines_around)
+
+    def mine_indices(self):
+        """Return the flat indices of every mine."""
+        return [match.start() for match in _MINED_BYTE.finditer(self.mine_map())]
+
+    def mine_revealed(self):
+        """Return True if a mine has been revealed, i.e. the game is lost."""
+        return _EXPLODED_BYTE.search(self.state) is not None
+
+    def snapshot(self, base=None):
+        """
+        Capture the cell states and counters of the board. The buffers are split in
+        chunks shared with base wherever they did not change, so an undo history, or
+        thousands of branches explored from one position, cost memory in proportion
+        to the cells each action touched.
+        :param base: Earlier snapshot of this board, usually the latest one
+        :return: A Snapshot, base itself if nothing changed since
+        """
+        counters = (self.flags_count, self.correct_flags, self.wrong_flags, self.hidden_safe, self.mines_placed,
+                    self.seed, self.first_click)
+        buffers = (self.state, self.mines_around, self.flags_around)
+        if base is None:
+            return Snapshot(tuple(split(buffer) for buffer in buffers), counters)
+        layers = tuple(split(buffer, chunks) for buffer, chunks in zip(buffers, base.layers))
+        if counters == base.counters and all(
+            chunk is base_chunk
+            for layer, base_layer in zip(layers, base.layers)
+            for chunk, base_chunk in zip(layer, base_layer)
+        ):
+            return base
+        return Snapshot(layers, counters)
+
+    def restore(self, snapshot):
+        """
+        Put the board back in the state of a snapshot, writing only the chunks that differ.
+        :param snapshot: Snapshot of this board
+        :return: Indices of the cells whose state changed, to repaint
+        :raise ValueError: If the snapshot was taken on a board of another size
+        """
+        state_chunks, mines_around_chunks, flags_around_chunks = snapshot.layers
+        if sum(len(chunk) for chunk in state_chunks) != self.size:
+            raise ValueError(f"Snapshot of another board than this {self.width}x{self.height} one")
+        changed = merge(self.state, state_chunks)
+        merge(self.mines_around, mines_around_chunks)
+        merge(self.flags_around, flags_around_chunks)
+        (self.flags_count, self.correct_flags, self.wrong_flags, self.hidden_safe, self.mines_placed,
+         self.seed, self.first_click) = snapshot.counters
+        if self.debug:
+            self.check_counters()
+        return changed
+
+    def _mines_placed(self):
+        """Compute the neighbour counts and counters once the mines are on the board."""
+        state = self.state
+        self.compute_mines_around()
+        self.mines_placed = True
+
+        # Flags may have been placed before the first click
+        self.correct_flags = state.translate(_CORRECT_FLAG_TABLE).count(1)
+        self.wrong_flags = self.flags_count - self.correct_flags
+        self.hidden_safe = self.size - self.mines_count - state.translate(_REVEALED_SAFE_TABLE).count(1)
+        if self.debug:
+            self.check_counters()
+
+    def compute_mines_around(self):
+        """Fill mines_around for every cell in one pass over the mine map, see Topology.count_around."""
+        self.mines_around[:] = self.topology.count_around(bytes(self.state).translate(_MINE_TABLE))
+
+    def count_mines_around(self, x, y):
+        """Count the mines in the neighborhood of a cell."""
+        state = self.state
+        return sum(1 for index in self.neighbors(x, y) if state[index] & MINED)
+
+    def count_flags_around(self, x, y):
+        """Count the flagged cells in the neighborhood of a cell."""
+        return self.flags_around[y * self.width + x]
+
+    def reveal(self, x, y):
+        """
+        Reveal a single cell if it's not flagged.
+        :return: True if the cell contains a mine, False otherwise
+        """
+        index = y * self.width + x
+        cell = self.state[index]
+        if not cell & FLAGGED:
+            if not cell & (REVEALED | MINED):
+                self.hidden_safe -= 1
+            self.state[index] = cell | REVEALED
+            if self.debug:
+                self.check_counters()
+            return bool(cell & MINED)
+        return False
+
+    def reveal_cell(self, x, y):
+        """
+        Reveal a cell, open the area around empty cells and chord satisfied numbers.
+        Chords are followed with an explicit stack of neighbor iterators, in the same
+        order as a recursive walk but without the interpreter's recursion limit.
+        :param x: X coordinate of the cell to reveal
+        :param y: Y coordinate of the cell to reveal
+        :return: Tuple (mine hit, list of the newly revealed indices)
+        """
+        state = self.state
+        mines_around = self.mines_around
+        hit = False
+        revealed = []
+
+        chords = []
+        index = y * self.width + x
+        while True:
+            if index is not None:
+                cell = state[index]
+                if not cell & FLAGGED and not cell & REVEALED:
+                    state[index] = cell | REVEALED
+                    revealed.append(index)
+                    if not cell & MINED:
+                        self.hidden_safe -= 1
+                if cell & MINED and not cell & FLAGGED:
+                    hit = True
+                else:
+                    cx, cy = index % self.width, index // self.width
+                    if mines_around[index] == 0:
+                        revealed.extend(self.flood_reveal(cx, cy))
+                    elif mines_around[index] == self.count_flags_around(cx, cy):
+                        chords.append(iter(self.topology.neighbors(index)))
+                index = None
+
+            if not chords:
+                break
+            for neighbor in chords[-1]:
+                if not state[neighbor] & (REVEALED | FLAGGED):
+                    if mines_around[neighbor] == 0:
+                        revealed.extend(self.flood_reveal(*self.coords(neighbor)))
+                    index = neighbor
+                    break
+            else:
+                chords.pop()
+
+        if self.debug:
+            self.check_counters()
+        return hit, revealed
+
+    def flood_reveal(self, x, y):
+        """
+        Open every safe cell connected to a cell through cells with no mines around.
+        This is an iterative scanline fill over a visited bitmap: each seed grows into
+        a run of empty cells with bytearray.find, then the rows above and below the run
+        are opened with slice operations and searched for new runs.
+        Rows wrap on torus boards and are offset on hex boards, so these walk the
+        neighborhoods instead, see flood_neighbors.
+        Flagged cells are left untouched.
+        :param x: X coordinate of the cell the fill starts from
+        :param y: Y coordinate of the cell the fill starts from
+        :return: List of the newly revealed indices
+        """
+        if self.topology.kind != SQUARE:
+            return self.flood_neighbors(x, y)
+        state = self.state
+        width, height = self.width, self.height
+        revealed = []
+
+        # Per row, 1 for the empty cells the fill may still expand. A row is built from
+        # the state before the fill touches it, and cells are cleared once visited.
+        expandable = {}
+
+        def row_mask(ny):
+            mask = expandable.get(ny)
+            if mask is None:
+                start = ny * width
+                empty = self.mines_around[start:start + width].translate(_EMPTY_TABLE)
+                unopened = state[start:start + width].translate(_UNOPENED_TABLE)
+                mask = int.from_bytes(empty, "little") & int.from_bytes(unopened, "little")
+                mask = expandable[ny] = bytearray(mask.to_bytes(width, "little"))
+            return mask
+
+        row_mask(y)[x] = 1
+        seeds = [(x, y)]
+        while seeds:
+            sx, sy = seeds.pop()
+            mask = expandable[sy]
+            if not mask[sx]:
+                continue
+
+            # Grow the seed into its run of expandable cells and mark it visited
+            left = mask.rfind(0, 0, sx) + 1
+            right = mask.find(0, sx)
+            if right < 0:
+                right = width
+            mask[left:right] = bytes(right - left)
+
+            x_start, x_stop = max(left - 1, 0), min(right + 1, width)
+            for ny in range(max(sy - 1, 0), min(sy + 2, height)):
+                mask = row_mask(ny)
+                start, stop = ny * width + x_start, ny * width + x_stop
+                cells = state[start:stop]
+                openable = cells.translate(_OPENABLE_TABLE)
+                state[start:stop] = cells.translate(_REVEAL_TABLE)
+
+                position = openable.find(1)
+                while position >= 0:
+                    run_end = openable.find(0, position)
+                    if run_end < 0:
+                        run_end = len(openable)
+                    revealed.extend(range(start + position, start + run_end))
+                    position = openable.find(1, run_end)
+
+                if ny != sy:
+                    position = mask.find(1, x_start, x_stop)
+                    while position >= 0:
+                        seeds.append((position, ny))
+                        run_end = mask.find(0, position, x_stop)
+                        if run_end < 0:
+                            break
+                        position = mask.find(1, run_end, x_stop)
+
+        # The fill never opens mines
+        self.hidden_safe -= len(revealed)
+        return revealed
+
+    def flood_neighbors(self, x, y):
+        """
+        Open every safe cell connected to a cell through cells with no mines around,
+        walking the neighborhoods with an explicit stack. Works on any topology.
+        :param x: X coordinate of the cell the fill starts from
+        :param y: Y coordinate of the cell the fill starts from
+        :return: List of the newly revealed indices
+        """
+        state = self.state
+        mines_around = self.mines_around
+        neighbors = self.topology.neighbors
+        revealed = []
+        stack = [y * self.width + x]
+        while stack:
+            index = stack.pop()
+            for neighbor in neighbors(index):
+                cell = state[neighbor]
+                # Opening a cell marks it visited, only cells opened here are expanded
+                if not cell & (REVEALED | MINED | FLAGGED):
+                    state[neighbor] = cell | REVEALED
+                    revealed.append(neighbor)
+                    if mines_around[neighbor] == 0:
+                        stack.append(neighbor)
+
+        # The fill never opens mines
+        self.hidden_safe -= len(revealed)
+        return revealed
+
+    def toggle_flag(self, x, y):
+        """
+        Cycle an unrevealed cell through flag, question mark and blank.
+        :return: True if the cell state changed, False otherwise
+        """
+        index = y * self.width + x
+        cell = self.state[index]
+        if cell & REVEALED or self.flags_count > self.mines_count:
+            return False
+        if not cell & (FLAGGED | QUESTIONED):
+            if self.flags_count >= self.mines_count:
+                return False
+            self.state[index] = cell | FLAGGED
+            self._count_flag(x, y, cell, 1)
+        elif cell & FLAGGED:
+            self.state[index] = (cell & ~FLAGGED) | QUESTIONED
+            self._count_flag(x, y, cell, -1)
+        else:
+            self.state[index] = cell & ~QUESTIONED
+
+        if self.debug:
+            self.check_counters()
+        return True
+
+    def _count_flag(self, x, y, cell, delta):
+        """Update the flag counters after a flag is added (delta 1) or removed (delta -1)."""
+        self.flags_count += delta
+        if cell & MINED:
+            self.correct_flags += delta
+        else:
+            self.wrong_flags += delta
+        flags_around = self.flags_around
+        for index in self.neighbors(x, y):
+            flags_around[index] += delta
+
+    def check_victory(self):
+        """Check if all mines are correctly flagged."""
+        mines = self.mines_count if self.mines_placed else 0
+        return self.correct_flags == mines and self.wrong_flags == 0
+
+    def check_counters(self):
+        """
+        Compare every running counter with a full recount of the board.
+        :raise AssertionError: If a counter has drifted
+        """
+        state = self.state
+        flags = sum(1 for cell in state if cell & FLAGGED)
+        correct = sum(1 for cell in state if cell & (MINED | FLAGGED) == MINED | FLAGGED)
+        hidden_safe = sum(1 for cell in state if not cell & (MINED | REVEALED))
+        assert self.flags_count == flags, f"flags_count {self.flags_count} != {flags}"
+        assert self.correct_flags == correct, f"correct_flags {self.correct_flags} != {correct}"
+        assert self.wrong_flags == flags - correct, f"wrong_flags {self.wrong_flags} != {flags - correct}"
+        assert self.hidden_safe == hidden_safe, f"hidden_safe {self.hidden_safe} != {hidden_safe}"
+        for y in range(self.height):
+            for x in range(self.width):
+                around = sum(1 for index in self.neighbors(x, y) if state[index] & FLAGGED)
+                assert self.flags_around[y * self.width + x] == around, f"flags_around at ({x}, {y})"
+
+    def reset(self):
+        """Reset the board to its initial state."""
+        self.state[:] = bytes(self.size)
+        self.mines_around[:] = bytes(self.size)
+        self.flags_around[:] = bytes(self.size)
+        self.flags_count = 0
+        self.correct_flags = 0
+        self.wrong_flags = 0
+        self.hidden_safe = self.size
+        self.mines_placed = False
+        self.seed = self.fixed_seed
+        self.first_click = None
+        if self.layout is not None:
+            self.load_mines(self.layout)
@@ -0,0 +1,150 @@
+import mmap
+import os
+import struct
+from board import Board
+from topology import TOPOLOGIES
+
+# Record header: magic, version, width, height, mines, seed, first click x and y,
+# and topology as an index into TOPOLOGIES.
+# A seed of -1 means unknown, a first click of (-1, -1) means none.
+HEADER = struct.Struct("<4sBIIIqiiB")
+MAGIC = b"MSWB"
+VERSION = 2
+# Headers by version, version 1 records have no topology and are square boards
+_HEADERS = {1: struct.Struct("<4sBIIIqii"), VERSION: HEADER}
+
+_BIT_CHARS = bytes.maketrans(b"\x00\x01", b"01")
+_BIT_BYTES = bytes.maketrans(b"01", b"\x00\x01")
+
+
+def pack_mines(board):
+    """
+    Pack the mine map of a board into a bitmap, bit i of the little-endian
+    bitmap being cell i.
+    :param board: Board with its mines placed
+    :return: Bitmap of (size + 7) // 8 bytes
+    """
+    digits = board.mine_map().translate(_BIT_CHARS)[::-1]
+    return int(digits or b"0", 2).to_bytes((board.size + 7) // 8, "little")
+
+
+def unpack_mines(bitmap, size):
+    """
+    Unpack a mine bitmap into one byte per cell.
+    :param bitmap: Bytes-like bitmap, bit i being cell i
+    :param size: Number of cells
+    :return: Bytes holding 1 for mined cells and 0 elsewhere
+    """
+    digits = format(int.from_bytes(bitmap, "little"), f"0{size}b").encode()
+    return digits[::-1].translate(_BIT_BYTES)
+
+
+def pack_board(board):
+    """
+    Serialize the mine layout of a board with its seed and first click.
+    :param board: Board with its mines placed
+    :return: Bytes of one record
+    """
+    first_x, first_y = board.first_click if board.first_click is not None else (-1, -1)
+    seed = board.seed if board.seed is not None else -1
+    header = HEADER.pack(MAGIC, VERSION, board.width, board.height, board.mines_count, seed, first_x, first_y,
+                         TOPOLOGIES.index(board.topology.kind))
+    return header + pack_mines(board)
+
+
+def record_size(buffer, offset=0):
+    """Return the size in bytes of the record at an offset, read from its header."""
+    header = _HEADERS.get(buffer[offset + 4])
+    if buffer[offset:offset + 4] != MAGIC or header is None:
+        raise ValueError(f"Not a board record at offset {offset}")
+    width, height = struct.unpack_from("<II", buffer, offset + 5)
+    return header.size + (width * height + 7) // 8
+
+
+def unpack_board(buffer, offset=0):
+    """
+    Rebuild a board from a record.
+    :param buffer: Bytes-like object holding the record, e.g. an mmap
+    :param offset: Offset of the record in the buffer
+    :return: Tuple (board, offset of the next record)
+    """
+    end = offset + record_size(buffer, offset)
+    fields = _HEADERS[buffer[offset + 4]].unpack_from(buffer, offset)
+    width, height, mines_count, seed, first_x, first_y = fields[2:8]
+    topology = TOPOLOGIES[fields[8]] if len(fields) > 8 else TOPOLOGIES[0]
+    start = end - (width * height + 7) // 8
+    mines = unpack_mines(buffer[start:end], width * height)
+
+    board = Board(width, height, mines_count, seed=None if seed < 0 else seed, topology=topology)
+    board.load_mine_map(mines)
+    if first_x >= 0:
+        board.first_click = (first_x, first_y)
+    return board, end
+
+
+def save_board(path, board):
+    """Append a board record to a file, creating it if needed."""
+    with open(path, "ab") as file:
+        file.write(pack_board(board))
+
+
+class RecordFile:
+    def __init__(self, path):
+        """
+        Memory-map a file of consecutive records for random access.
+        Only the headers are read when the file is opened, see size_at.
+        :param path: Path of the file
+        """
+        self.file = open(path, "rb")
+        # mmap refuses empty files, an empty bytes object reads the same
+        self.map = b""
+        if os.fstat(self.file.fileno()).st_size:
+            self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+        self.offsets = []
+        offset = 0
+        while offset < len(self.map):
+            self.offsets.append(offset)
+            offset += self.size_at(offset)
+
+    def size_at(self, offset):
+        """
+        Return the size in bytes of the record at an offset, read from its header.
+        :raise ValueError: If there is no record at the offset
+        """
+        raise NotImplementedError
+
+    def read(self, offset):
+        """Return the record at an offset."""
+        raise NotImplementedError
+
+    def __len__(self):
+        return len(self.offsets)
+
+    def __getitem__(self, number):
+        return self.read(self.offsets[number])
+
+    def __iter__(self):
+        for offset in self.offsets:
+            yield self.read(offset)
+
+    def close(self):
+        """Release the mapping and the file."""
+        if isinstance(self.map, mmap.mmap):
+            self.map.close()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        self.close()
+
+
+class BoardFile(RecordFile):
+    """A memory-mapped file of board records, indexed like a list of boards."""
+
+    def size_at(self, offset):
+        return record_size(self.map, offset)
+
+    def read(self, offset):
+        return unpack_board(self.map, offset)[0]
@@ -1,82 +1,62 @@
-import tkinter as tk
-from PIL import Image, ImageTk
+from board import MINED, REVEALED, FLAGGED, QUESTIONED
 
 
 class Cell:
-    def __init__(self, x, y, size, game):
+    __slots__ = ("x", "y", "index", "grid", "board")
+
+    def __init__(self, x, y, grid):
         """
-        Initialize a Cell object.
+        Initialize a Cell object, a lightweight view of one board cell.
+        Cells are created on demand by the grid and hold no state of their own.
         :param x: X coordinate in the grid
         :param y: Y coordinate in the grid
-        :param size: Size of the cell (width = height)
-        :param game: Reference to the game instance
+        :param grid: Grid the cell belongs to
         """
         self.x = x
         self.y = y
-        self.size = size        
-        self.is_mined = False
-        self.is_revealed = False
-        self.is_flagged = False
-        self.is_questionned = False
-        self.is_inspected = False
-        self.mines_around = 0
-        self.flags_around = 0
-        self.game = game
-        
-        # Load images for different cell states
-        self.mine = ImageTk.PhotoImage(Image.open("images/mine.png"))
-        self.exploded_mine = ImageTk.PhotoImage(Image.open("images/exploded-mine.png"))
-        self.wrong_mine = ImageTk.PhotoImage(Image.open("images/wrong-mine.png"))
-        self.neutral = ImageTk.PhotoImage(Image.open("images/neutral.png"))
-        self.flagged = ImageTk.PhotoImage(Image.open("images/flag.png"))
-        self.img_button = ImageTk.PhotoImage(Image.open("images/button.png"))
-        self.question_mark = ImageTk.PhotoImage(Image.open("images/QM.png"))
-        
-        # Load number images from 1 to 8
-        self.number_images = {
-            i: ImageTk.PhotoImage(Image.open(f"images/{i}.png")) for i in range(1, 9)
-        }
+        self.grid = grid
+        self.board = grid.board
+        self.index = self.board.index(x, y)
+
+    def __eq__(self, other):
+        return isinstance(other, Cell) and other.grid is self.grid and other.index == self.index
+
+    def __hash__(self):
+        return self.index
+
+    @property
+    def is_mined(self):
+        return bool(self.board.state[self.index] & MINED)
+
+    @property
+    def is_revealed(self):
+        return bool(self.board.state[self.index] & REVEALED)
+
+    @property
+    def is_flagged(self):
+        return bool(self.board.state[self.index] & FLAGGED)
+
+    @property
+    def is_questionned(self):
+        return bool(self.board.state[self.index] & QUESTIONED)
+
+    @property
+    def is_inspected(self):
+        return self.index in self.grid.inspected
+
+    @property
+    def mines_around(self):
+        return self.board.mines_around[self.index]
+
+    @property
+    def flags_around(self):
+        return self.board.flags_around[self.index]
 
-    def draw(self, parent_frame, on_right_press, on_right_release, on_left_press, on_left_release):
-        """
-        Draw the cell as a button in the given screen.
-        :param parent_frame: Parent widget (the game grid)
-        """
-        button = tk.Button(
-            parent_frame,
-            width=self.size,
-            height=self.size,
-            borderwidth=0,  # Remove the border
-            relief="sunken",  # Prevent click effect
-            highlightthickness=0
-        )
-        button.grid(row=self.y, column=self.x, padx=0, pady=0)
-        self.button = button  # Keep a reference to the button for later updates
-        
-        # Bind mouse click events
-        button.bind("<ButtonPress-1>", lambda event: on_left_press(self, event))
-        self.button.bind("<ButtonRelease-1>", lambda event: on_left_release(self, event))
-        self.button.bind("<ButtonPress-3>", lambda event: on_right_press(self, event))
-        self.button.bind("<ButtonRelease-3>", lambda event: on_right_release(self, event))
-        
-        button.configure(image=self.img_button)  # Show button image if not revealed
-            
     def toggle_flags(self):
         """
         Toggle flag status if the cell is not revealed.
         """
-        if not self.is_revealed:
-            if self.game.flags_count <= self.game.mines_count:
-                if not self.is_questionned and not self.is_flagged:
-                    if self.game.flags_count < self.game.mines_count:
-                        self.game.flags_count += 1
-                        self.is_flagged = True
-                elif self.is_flagged:
-                    self.is_flagged = False
-                    self.is_questionned = True
-                    self.game.flags_count -= 1
-                else:
-                    self.is_questionned = False
+        self.board.toggle_flag(self.x, self.y)
         self.update_button()
 
     def reveal(self):
@@ -84,56 +64,12 @@ class Cell:
         Reveal the cell if it's not flagged.
         :return: True if the cell contains a mine, False otherwise
         """
-        if not self.is_flagged:
-            self.is_revealed = True
-            self.update_button()
-            return self.is_mined
-        return False
-    
+        mined = self.board.reveal(self.x, self.y)
+        self.update_button()
+        return mined
+
     def update_button(self):
         """
-        Update the button's image after revealing the cell.
-        """
-        if self.is_revealed:
-            if self.is_mined:
-                self.button.configure(image=self.exploded_mine)
-            elif self.mines_around > 0:
-                self.button.configure(image=self.number_images.get(self.mines_around))
-            else:
-                self.button.configure(image=self.neutral)  # Neutral image when no adjacent mines
-        else:
-            if self.is_flagged:
-                self.button.configure(image=self.flagged)
-            elif self.is_questionned:
-                self.button.configure(image=self.question_mark)
-            elif self.is_inspected:
-                self.button.configure(image=self.neutral)
-            else:
-                self.button.configure(image=self.img_button)
-        
-    def draw_game_over(self):
-        """
-        Update the button's image for game over state.
-        """
-        if self.is_mined:
-            if self.is_flagged:
-                self.button.configure(image=self.flagged)
-            elif self.is_revealed:
-                self.button.configure(image=self.exploded_mine)
-            else:
-                self.button.configure(image=self.mine)
-        else:
-            if self.is_flagged:
-                self.button.configure(image=self.wrong_mine)
-    
-    def reset(self):
-        """
-        Reset the cell to its initial state.
+        Schedule a repaint of the cell.
         """
-        self.is_mined = False
-        self.is_revealed = False
-        self.is_flagged = False
-        self.is_questionned = False
-        self.is_inspected = False
-        self.mines_around = 0
-        self.flags_around = 0
+        self.grid.update_cells((self.index,))
@@ -0,0 +1,42 @@
+import time
+
+
+class Clock:
+    def __init__(self):
+        """
+        Initialize a stopwatch on the monotonic performance counter.
+        It only reads the counter when started, stopped or queried, so its value
+        does not depend on how often, or how late, the UI asks for it.
+        """
+        self.started_ns = None
+        self.elapsed_ns = 0
+
+    @property
+    def running(self):
+        return self.started_ns is not None
+
+    def start(self):
+        """Start or resume the clock."""
+        if self.started_ns is None:
+            self.started_ns = time.perf_counter_ns()
+
+    def stop(self):
+        """Pause the clock, keeping the time elapsed so far."""
+        if self.started_ns is not None:
+            self.elapsed_ns += time.perf_counter_ns() - self.started_ns
+            self.started_ns = None
+
+    def reset(self):
+        """Stop the clock and set it back to zero."""
+        self.started_ns = None
+        self.elapsed_ns = 0
+
+    def elapsed_ms(self):
+        """
+        Read the clock.
+        :return: Elapsed time in whole milliseconds
+        """
+        elapsed = self.elapsed_ns
+        if self.started_ns is not None:
+            elapsed += time.perf_counter_ns() - self.started_ns
+        return elapsed // 1_000_000
@@ -0,0 +1,128 @@
+import argparse
+import struct
+import time
+from boardfile import RecordFile, pack_board, record_size, unpack_board
+from grid import Grid
+
+# Game record header: magic, version and number of events. It is followed by
+# the board record of boardfile.py, then by the events.
+GAME = struct.Struct("<4sBI")
+MAGIC = b"MSWL"
+VERSION = 1
+# Event: milliseconds since the game started, action, x and y
+EVENT = struct.Struct("<IBII")
+
+LEFT_PRESS = 1
+LEFT_RELEASE = 2
+RIGHT_PRESS = 3
+CHORD = 4
+# Undo and redo are logged at cell (0, 0)
+UNDO = 5
+REDO = 6
+
+WON = "won"
+LOST = "lost"
+UNFINISHED = "unfinished"
+
+
+class EventLog:
+    def __init__(self, path):
+        """
+        Initialize a recorder of the player actions.
+        Events are buffered in memory and each game is appended to the log in a
+        single write once the player moves on to another game.
+        :param path: Path of the log file, created if needed
+        """
+        self.path = path
+        self.events = bytearray()
+        self.count = 0
+
+    def record(self, timestamp, action, x, y):
+        """
+        Buffer one action.
+        :param timestamp: Milliseconds since the game started
+        :param action: LEFT_PRESS, LEFT_RELEASE, RIGHT_PRESS, CHORD, UNDO or REDO
+        :param x: X coordinate of the cell
+        :param y: Y coordinate of the cell
+        """
+        self.events += EVENT.pack(timestamp, action, x, y)
+        self.count += 1
+
+    def finish(self, board):
+        """
+        Append the buffered game to the log, with the board it was played on.
+        Games whose mines were never placed are dropped.
+        :param board: Board of the game
+        """
+        if self.count and board.mines_placed:
+            with open(self.path, "ab") as file:
+                file.write(GAME.pack(MAGIC, VERSION, self.count) + pack_board(board) + self.events)
+        self.events = bytearray()
+        self.count = 0
+
+
+class EventLogFile(RecordFile):
+    """A memory-mapped log of recorded games, indexed like a list of (board, events)."""
+
+    def size_at(self, offset):
+        magic, version, count = GAME.unpack_from(self.map, offset)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"Not a game record at offset {offset}")
+        return GAME.size + record_size(self.map, offset + GAME.size) + count * EVENT.size
+
+    def read(self, offset):
+        """
+        Read the game recorded at an offset.
+        :return: Tuple (board, events), events being bytes of EVENT entries
+        """
+        _, _, count = GAME.unpack_from(self.map, offset)
+        board, start = unpack_board(self.map, offset + GAME.size)
+        return board, self.map[start:start + count * EVENT.size]
+
+
+def replay(board, events):
+    """
+    Replay a recorded game on a Grid without any window, as fast as possible.
+    :param board: Board of the recorded game, with its mines
+    :param events: Buffer of EVENT entries
+    :return: Tuple (grid, WON, LOST or UNFINISHED)
+    """
+    grid = Grid(0, board.width, board.height, board.mines_count, seed=board.seed, layout=board.mine_indices(),
+                topology=board.topology.kind)
+    # The action byte of every event, after its timestamp
+    actions = events[4::EVENT.size]
+    if UNDO in actions:
+        # Only games where the player undid an action pay for the snapshots
+        grid.enable_history()
+    outcome = UNFINISHED
+    for _, action, x, y in EVENT.iter_unpack(events):
+        if action == RIGHT_PRESS:
+            grid.cell(x, y).toggle_flags()
+            grid.remember()
+        elif action == LEFT_RELEASE or action == CHORD:
+            if grid.reveal_cell(x, y):
+                outcome = LOST
+            elif grid.check_victory():
+                outcome = WON
+            grid.remember()
+        elif action == UNDO or action == REDO:
+            grid.undo() if action == UNDO else grid.redo()
+            outcome = LOST if grid.game_over_drawn else WON if grid.check_victory() else UNFINISHED
+        if outcome != UNFINISHED and not grid.keep_history:
+            # Without undo the game is decided
+            break
+    return grid, outcome
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Replay recorded games without a window")
+    parser.add_argument("log", help="event log written by game.py --record")
+    args = parser.parse_args()
+
+    outcomes = {WON: 0, LOST: 0, UNFINISHED: 0}
+    with EventLogFile(args.log) as games:
+        start = time.perf_counter()
+        for board, events in games:
+            outcomes[replay(board, events)[1]] += 1
+        elapsed = time.perf_counter() - start
+    print(f"{len(games)} games in {elapsed:.3f}s ({len(games) / max(elapsed, 1e-9):.0f} games/s): {outcomes}")
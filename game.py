@@ -1,35 +1,69 @@
+import argparse
 import tkinter as tk
+from eventlog import EventLog, LEFT_PRESS, LEFT_RELEASE, RIGHT_PRESS, CHORD, UNDO, REDO
 from grid import Grid
 from topbar import TopBar
+from sprites import clear_sprites
+from topology import SQUARE, HEX, TOPOLOGIES
+
+# Modules only some games need (the no-guess workers, profiling, board files and
+# the statistics database) are imported where they are used, to start faster
+
+# Largest part of the screen the window may take, larger grids are scrolled
+SCREEN_FRACTION = 0.9
+SCROLLBAR_SIZE = 16
+# Milliseconds between two checks of a no-guess board being generated
+DEAL_POLL_MS = 20
 
 
 class Game:
-    def __init__(self, row_cell_num=9, column_cell_num=9, mines_count=10):
+    def __init__(self, row_cell_num=9, column_cell_num=9, mines_count=10, debug=False, seed=None, layout=None,
+                 instrumentation=None, event_log=None, topology=SQUARE, stats=None):
         self.app = tk.Tk()
+        self.debug = debug
+        # Optional latency recorder, handlers are only wrapped when there is one
+        self.instrumentation = instrumentation
+        # Optional recorder of the player actions
+        self.event_log = event_log
+        # Optional StatsStore receiving every finished game
+        self.stats = stats
+        # A fixed seed or mine layout makes every game reproducible
+        self.seed = seed
+        self.layout = layout
+        # SQUARE, TORUS or HEX, kept across size changes
+        self.topology = topology
+        # No-guess board generator, only started when the mode is enabled
+        self.generator = None
+        # Future of the no-guess board being generated for the first click, input waits for it
+        self.dealing = None
         self.cell_size = 30
         self.row_cell_num = row_cell_num
         self.column_cell_num = column_cell_num
         self.mines_count = mines_count
-        self.flags_count = 0
         self.running = False
+        # Final time of the last finished game, in milliseconds
+        self.duration_ms = None
+        # Reveals, chords and flags of the current game
+        self.clicks = 0
+        # True once won, False once lost, None while unfinished; an undo can change it
+        self.outcome = None
+        # True once an undo was used, the result then never counts as a best time
+        self.assisted = False
         self.game_over = False
+        # True once every mine is flagged, input stops as after a loss
+        self.won = False
         self.is_left_click_pressed = False
         self.is_left_click_active = False
         self.is_right_click_pressed = False
         self.current_cell = None
+        # Latest pointer motion, handled once per event-loop tick
+        self.motion_event = None
+        self.motion_pending = False
 
         # Calculate window size
         self.topbar_frame_size_y = 100
         self.app.title("Minesweeper")
-        self.grid_size_x = self.row_cell_num * self.cell_size
-        self.grid_size_y = self.column_cell_num * self.cell_size
-        self.app_x = self.grid_size_x
-        self.app_y = self.topbar_frame_size_y + self.grid_size_y
-        self.app.geometry(f"{self.app_x}x{self.app_y}")
-        
-        # Set minimum and maximum window size
-        self.app.maxsize(width=self.app_x, height=self.app_y)
-        self.app.minsize(width=self.app_x, height=self.app_y)
+        self.resize_window()
 
         # Create a frame for the TopBar
         self.topbar_frame = tk.Frame(self.app)
@@ -45,46 +79,47 @@ class Game:
         self.grid_frame.grid(row=1, column=0, sticky="nsew")
 
         def on_right_press(cell, event):
-            if not self.game_over:
+            if not self.game_over and not self.won and self.dealing is None:
                 """Handle right-click to place a flag on a cell."""
                 self.is_right_click_pressed = True
                 if self.is_left_click_pressed:
                     self.is_left_click_active = False
                     on_hover()
                 if not self.is_left_click_pressed:
+                    self.record(RIGHT_PRESS, cell)
+                    self.clicks += 1
                     cell.toggle_flags()
+                    self.grid.remember()
                     self.topbar.update_flags()
 
         def on_right_release(cell, event):
-            if not self.game_over:
+            if not self.game_over and not self.won:
                 """Reset inspected cells when the right-click is released."""
                 self.is_right_click_pressed = False
 
         def on_left_press(cell, event):
-            if not self.game_over:
+            if not self.game_over and not self.won and self.dealing is None:
                 """Initialize the hovered cell when the left-click is held."""
                 self.is_left_click_pressed = True
                 self.is_left_click_active = True
                 self.current_cell = cell
+                self.record(LEFT_PRESS, cell)
                 on_hover()
 
         def on_left_release(cell, event):
-            if not self.game_over:
+            if not self.game_over and not self.won and self.dealing is None:
                 """Reset inspected cells when the left-click is released."""
                 self.is_left_click_pressed = False
+                process_motion()
                 if self.is_left_click_active:
-                    self.game_over = self.grid.reveal_cell(self.current_cell.x, self.current_cell.y)
-                for cell in self.grid.inspected_cells:
-                    cell.is_inspected = False
-                    cell.update_button()
-                self.grid.inspected_cells.clear()
+                    self.record(CHORD if self.current_cell.is_revealed else LEFT_RELEASE, self.current_cell)
+                    self.clicks += 1
+                    if self.generator is not None and not self.grid.mines_placed:
+                        self.deal(self.current_cell.x, self.current_cell.y)
+                    else:
+                        self.reveal(self.current_cell.x, self.current_cell.y)
+                self.grid.clear_inspected_cells()
                 self.is_left_click_active = False
-                if self.grid.recursive_game_over:
-                    self.game_over = True
-                if self.game_over:
-                    self.handle_game_over()
-                else:
-                    self.running = not self.grid.check_victory()
 
         def on_hover():
             """Inspect a cell when the mouse hovers over it with left-click held."""
@@ -98,42 +133,225 @@ class Game:
                 self.grid.update_inspected_cells_single(self.current_cell.x, self.current_cell.y)
 
         def on_motion(event):
-            """Detect mouse movement while left-click is held."""
-            global_x, global_y = event.x_root, event.y_root
-            x = (global_x - self.app.winfo_rootx()) // self.cell_size
-            y = (global_y - self.topbar_frame_size_y - self.app.winfo_rooty()) // self.cell_size
+            """Detect mouse movement while left-click is held, coalescing bursts of motion events."""
+            self.motion_event = event
+            if not self.motion_pending:
+                self.motion_pending = True
+                self.app.after_idle(process_motion)
 
-            if 0 <= x < self.row_cell_num and 0 <= y < self.column_cell_num:
-                self.current_cell = self.grid.cells[x][y]
+        def process_motion():
+            """Handle the latest pointer motion, if it was not handled yet."""
+            if not self.motion_pending:
+                return
+            self.motion_pending = False
+            cell = self.grid.renderer.cell_at(self.motion_event.x, self.motion_event.y)
+
+            if cell is not None:
                 if self.is_left_click_pressed:
                     if not self.is_right_click_pressed:
                         self.is_left_click_active = True
-                on_hover()
+                # Moving within the same cell changes nothing
+                if cell != self.current_cell:
+                    self.current_cell = cell
+                    on_hover()
+            if self.instrumentation is not None:
+                self.instrumentation.handled()
+
+        if self.instrumentation is not None:
+            on_right_press = self.instrumentation.wrap_handler("right_press", on_right_press)
+            on_left_press = self.instrumentation.wrap_handler("left_press", on_left_press)
+            on_left_release = self.instrumentation.wrap_handler("left_release", on_left_release)
+            # Motion events only schedule process_motion, which completes them
+            on_motion = self.instrumentation.wrap_handler("motion", on_motion, deferred=True)
 
         # Create and draw the grid
-        self.grid = Grid(self.cell_size, self.row_cell_num, self.column_cell_num, self.mines_count, self)
-        self.grid.draw(self.grid_frame, on_right_press, on_right_release, on_left_press, on_left_release)
-        self.app.bind("<B1-Motion>", on_motion)
+        self.grid = Grid(self.cell_size, self.row_cell_num, self.column_cell_num, self.mines_count, debug=self.debug,
+                         seed=self.seed, layout=self.layout, topology=self.topology,
+                         on_start=self.topbar.start_timer)
+        self.grid.draw(self.grid_frame, self.grid_size_x, self.grid_size_y, on_right_press, on_right_release,
+                       on_left_press, on_left_release)
+        self.grid.renderer.canvas.bind("<B1-Motion>", on_motion)
+        self.grid.enable_history()
+        if self.instrumentation is not None:
+            self.instrumentation.attach(self)
+        self.app.bind("<h>", lambda event: self.show_hint())
+        self.app.bind("<Control-z>", lambda event: self.undo())
+        self.app.bind("<Control-y>", lambda event: self.redo())
+        for key, steps in (("<plus>", 1), ("<equal>", 1), ("<minus>", -1)):
+            self.app.bind(key, lambda event, s=steps: self.zoom(s))
+
+    @property
+    def flags_count(self):
+        """Number of flags currently placed on the board."""
+        return self.grid.board.flags_count
+
+    def show_hint(self):
+        """Highlight the safest cell to reveal next."""
+        if not self.game_over and not self.won:
+            self.grid.hint()
+
+    def reveal(self, x, y):
+        """Reveal a cell, then handle a lost or won game."""
+        self.game_over = self.grid.reveal_cell(x, y)
+        self.grid.remember()
+        if self.game_over:
+            self.handle_game_over()
+        elif self.grid.mines_placed and self.grid.check_victory():
+            self.handle_victory()
+
+    def deal(self, x, y):
+        """
+        Start a no-guess game from a first click. Boards are generated off the Tk
+        thread; until one is ready, the window shows a busy cursor and ignores clicks.
+        """
+        future = self.dealing = self.generator.take(self.row_cell_num, self.column_cell_num, self.mines_count,
+                                                    x, y, self.topology)
+
+        def dealt():
+            if self.dealing is not future:
+                # Reset or resized meanwhile
+                return
+            if not future.done():
+                self.app.after(DEAL_POLL_MS, dealt)
+                return
+            self.dealing = None
+            self.app.configure(cursor="")
+            seed, start_x, start_y = future.result()
+            if seed is None:
+                # The mode was turned off meanwhile, play a random board from the click
+                start_x, start_y = x, y
+            else:
+                # No-guess boards are solved from their own start cell, which opens the clicked one
+                self.grid.board.seed = seed
+            self.reveal(start_x, start_y)
+
+        if not future.done():
+            self.app.configure(cursor="watch")
+        dealt()
+
+    def open_stats(self, path=None):
+        """
+        Open the statistics store and show the best time, e.g. once the window is shown.
+        :param path: Path of the database file, in the home directory if None
+        """
+        from stats import StatsStore, DEFAULT_PATH
+
+        self.stats = StatsStore(path or DEFAULT_PATH)
+        self.topbar.update_best()
+
+    def set_no_guess(self, enabled):
+        """Turn the no-guess mode on or off, for the next board."""
+        if enabled and self.generator is None:
+            from noguess import NoGuessGenerator
+
+            self.generator = NoGuessGenerator()
+            self.generator.set_preset(self.row_cell_num, self.column_cell_num, self.mines_count, self.topology)
+        elif not enabled and self.generator is not None:
+            self.generator.close()
+            self.generator = None
+
+    def set_topology(self, topology):
+        """Start over on a board of the same size with another topology."""
+        if topology != self.topology:
+            self.topology = topology
+            self.change_mode(self.row_cell_num, self.column_cell_num, self.mines_count)
+
+    def record(self, action, cell=None):
+        """Log a player action, if recording. Actions on no cell are logged at (0, 0)."""
+        if self.event_log is not None:
+            x, y = (cell.x, cell.y) if cell is not None else (0, 0)
+            self.event_log.record(self.topbar.clock.elapsed_ms(), action, x, y)
+
+    def finish_recording(self):
+        """
+        Write the actions of the current game to the log, if recording, and its
+        result to the statistics, if it finished. Games are written when the player
+        moves on to another one, as an undo can resume them; a game is written once.
+        """
+        if self.event_log is not None:
+            self.event_log.finish(self.grid.board)
+        if self.stats is not None and self.outcome is not None:
+            self.stats.record(self.grid.board, self.outcome, self.duration_ms, self.clicks,
+                              self.generator is not None, self.assisted)
+        self.outcome = None
+
+    def undo(self):
+        """Take back the last reveal or flag, including the one that lost the game."""
+        if self.grid.undo():
+            self.assisted = True
+            self.record(UNDO)
+            self.restored()
+
+    def redo(self):
+        """Play again the last action undone."""
+        if self.grid.redo():
+            self.record(REDO)
+            self.restored()
+
+    def restored(self):
+        """Follow the board after an undo or redo: the game may be lost, won or running again."""
+        self.current_cell = None
+        self.is_left_click_active = False
+        self.game_over = self.grid.game_over_drawn
+        self.won = not self.game_over and self.grid.mines_placed and self.grid.check_victory()
+        self.outcome = False if self.game_over else True if self.won else None
+        self.topbar.update_flags()
+        if self.game_over or self.won:
+            if self.running:
+                self.topbar.stop_timer()
+        elif self.grid.started:
+            self.topbar.start_timer()
+
+    def zoom(self, steps):
+        """Zoom the grid in or out around the center of the view."""
+        self.grid.renderer.zoom(steps, self.grid_size_x // 2, self.grid_size_y // 2)
+
+    def handle_victory(self):
+        """Handle a won game."""
+        self.won = True
+        self.current_cell = None
+        # The first outcome of a game stands, only an undo or redo changes it
+        if self.outcome is None:
+            self.outcome = True
+        self.topbar.stop_timer()
+        if self.instrumentation is not None:
+            self.instrumentation.game_finished()
 
     def handle_game_over(self):
         """Handle game over state."""
-        self.running = False
         self.game_over = True
         self.current_cell = None
-        self.grid.draw_game_over()
-        self.topbar.update_timer()
+        self.topbar.stop_timer()
+        if self.outcome is None:
+            self.outcome = False
+        if self.instrumentation is not None:
+            self.instrumentation.game_finished()
 
     def reset_game(self):
         """Reset the game state."""
-        self.grid.recursive_game_over = False
         self.running = False
         self.current_cell = None
-        self.flags_count = 0
         self.game_over = False
+        self.won = False
+        if self.dealing is not None:
+            self.dealing = None
+            self.app.configure(cursor="")
+        self.duration_ms = None
+        self.clicks = 0
+        self.outcome = None
+        self.assisted = False
         self.is_left_click_pressed = False
         self.is_left_click_active = False
         self.is_right_click_pressed = False
         self.topbar.reset_timer()
+        if self.instrumentation is not None:
+            self.instrumentation.new_game()
+
+    def save_board(self, path):
+        """Append the current board to a board file, to share or replay it."""
+        from boardfile import save_board
+
+        save_board(path, self.grid.board)
 
     def run(self):
         """Run the Tkinter event loop."""
@@ -141,15 +359,96 @@ class Game:
 
     def destroy(self):
         """Destroy the Tkinter window."""
+        self.finish_recording()
+        if self.generator is not None:
+            self.generator.close()
+        if self.instrumentation is not None:
+            self.instrumentation.close()
+        if self.stats is not None:
+            self.stats.close()
+        clear_sprites(self.app)
         self.app.destroy()
 
+    def resize_window(self):
+        """Size the window to fit the topbar and the grid, scrolling grids larger than the screen."""
+        board_x = self.row_cell_num * self.cell_size
+        if self.topology == HEX:
+            # Odd rows are shifted by half a cell
+            board_x += self.cell_size // 2
+        board_y = self.column_cell_num * self.cell_size
+        max_x = int(self.app.winfo_screenwidth() * SCREEN_FRACTION)
+        max_y = int(self.app.winfo_screenheight() * SCREEN_FRACTION) - self.topbar_frame_size_y
+        self.grid_size_x = min(board_x, max_x)
+        self.grid_size_y = min(board_y, max_y)
+        # Room for the scrollbars of a grid larger than the window
+        self.app_x = self.grid_size_x + (SCROLLBAR_SIZE if board_y > max_y else 0)
+        self.app_y = self.topbar_frame_size_y + self.grid_size_y + (SCROLLBAR_SIZE if board_x > max_x else 0)
+        self.app.geometry(f"{self.app_x}x{self.app_y}")
+
+        # Set minimum and maximum window size
+        self.app.maxsize(width=self.app_x, height=self.app_y)
+        self.app.minsize(width=self.app_x, height=self.app_y)
+
     def change_mode(self, row_cell_num, column_cell_num, mines_count):
-        """Close the current game instance and create a new one."""
-        self.destroy()  # Destroy the current window
-        new_game = Game(row_cell_num, column_cell_num, mines_count)  # Create new instance
-        new_game.run()  # Start the new game
+        """Switch to another board size in place, keeping the window, sprites and canvas."""
+        self.row_cell_num = row_cell_num
+        self.column_cell_num = column_cell_num
+        self.mines_count = mines_count
+        self.finish_recording()
+        self.resize_window()
+        self.grid.resize(row_cell_num, column_cell_num, mines_count, self.grid_size_x, self.grid_size_y, self.topology)
+        if self.generator is not None:
+            self.generator.set_preset(row_cell_num, column_cell_num, mines_count, self.topology)
+        self.reset_game()
+        self.topbar.change_mode(self.grid_size_x)
 
 
 if __name__ == "__main__":
-    game = Game()
+    parser = argparse.ArgumentParser(description="Minesweeper")
+    parser.add_argument("--seed", type=int, help="seed of the mine placement")
+    parser.add_argument("--size", help="board size as WIDTHxHEIGHT, e.g. 1000x1000")
+    parser.add_argument("--mines", type=int, help="number of mines of a --size board")
+    parser.add_argument("--topology", choices=TOPOLOGIES, default=SQUARE, help="shape of the board cells")
+    parser.add_argument("--board", help="file of saved boards to replay")
+    parser.add_argument("--index", type=int, default=0, help="record to replay from --board")
+    parser.add_argument("--no-guess", action="store_true", help="only deal boards solvable without guessing")
+    parser.add_argument("--latency", help="write input-to-paint latencies to this JSON file on exit")
+    parser.add_argument("--profile", help="directory receiving a cProfile dump per game")
+    parser.add_argument("--record", help="append every game played to this event log")
+    parser.add_argument("--stats", help="database of finished games and best times, in the home directory by default")
+    parser.add_argument("--no-stats", action="store_true", help="do not keep statistics")
+    args = parser.parse_args()
+
+    instrumentation = None
+    if args.latency or args.profile:
+        from instrument import Instrumentation
+
+        instrumentation = Instrumentation(profile_dir=args.profile)
+    event_log = EventLog(args.record) if args.record else None
+
+    if args.board:
+        from boardfile import BoardFile
+
+        with BoardFile(args.board) as boards:
+            board = boards[args.index]
+        game = Game(board.width, board.height, board.mines_count, layout=board.mine_indices(),
+                    instrumentation=instrumentation, event_log=event_log, topology=board.topology.kind)
+    else:
+        width, height = map(int, args.size.lower().split("x")) if args.size else (9, 9)
+        mines_count = args.mines if args.mines is not None else (width * height) // 8
+        game = Game(width, height, mines_count, seed=args.seed, instrumentation=instrumentation,
+                    event_log=event_log, topology=args.topology)
+    if args.no_guess:
+        game.topbar.no_guess.set(True)
+        game.set_no_guess(True)
+    if not args.no_stats:
+        # No game ends before the window is shown, the database is opened once it is painted
+        game.app.after_idle(game.open_stats, args.stats)
     game.app.mainloop()
+    game.finish_recording()
+    if game.generator is not None:
+        game.generator.close()
+    if game.stats is not None:
+        game.stats.close()
+    if args.latency:
+        instrumentation.export(args.latency)
@@ -1,32 +1,57 @@
-import random
+from board import Board
 from cell import Cell
+from snapshot import History
+from solver import Solver
+from topology import SQUARE
 
 
 class Grid:
-    def __init__(self, cell_size, row_cell_num, column_cell_num, mines_count, game):
+    def __init__(self, cell_size, row_cell_num, column_cell_num, mines_count, debug=False, seed=None, layout=None,
+                 topology=SQUARE, on_start=None):
         """
         Initialize a Grid object.
         :param cell_size: Size of each cell
         :param row_cell_num: Number of rows in the grid
         :param column_cell_num: Number of columns in the grid
         :param mines_count: Number of mines to be placed on the grid
-        :param game: Reference to the main game instance
+        :param debug: Check the board counters after every action
+        :param seed: Seed of the mine placement, random if None
+        :param layout: Board indices of the mines of the first board, placed at the first click if None
+        :param topology: SQUARE, TORUS or HEX
+        :param on_start: Function called on the first reveal of every game, e.g. to start a timer
         """
         self.cell_size = cell_size
         self.row_cell_num = row_cell_num
         self.column_cell_num = column_cell_num
         self.mines_count = mines_count
-        self.game = game
-        self.recursive_game_over = False
+        self.debug = debug
+        self.seed = seed
+        self.topology = topology
+        self.on_start = on_start
 
-        # Create a 2D list of Cell objects for the grid
-        self.cells = [
-            [Cell(x, y, self.cell_size, game) for y in range(self.column_cell_num)]
-            for x in range(self.row_cell_num)
-        ]
+        # The board holds the game state, cells are views created on demand
+        self.board = Board(
+            self.row_cell_num, self.column_cell_num, self.mines_count,
+            debug=debug, seed=seed, layout=layout, topology=topology,
+        )
+        self.renderer = None
+        self.solver = None
+        # Undo and redo history, only kept once enabled
+        self.keep_history = False
+        self.history = None
+        self.started = False
 
-        self.mines_placed = False
-        self.inspected_cells = set()
+        # Indices of the cells under a held left click
+        self.inspected = set()
+        self.game_over_drawn = False
+
+    def cell(self, x, y):
+        """Return the Cell view at (x, y)."""
+        return Cell(x, y, self)
+
+    @property
+    def mines_placed(self):
+        return self.board.mines_placed
 
     def place_mines(self, safe_x, safe_y):
         """
@@ -34,24 +59,7 @@ class Grid:
         :param safe_x: X coordinate of the safe cell (first clicked cell)
         :param safe_y: Y coordinate of the safe cell (first clicked cell)
         """
-        mines_to_place = self.mines_count
-        safe_zone = {
-            (safe_x + dx, safe_y + dy) for dx in range(-1, 2) for dy in range(-1, 2)
-        }
-        while mines_to_place > 0:
-            # Randomly pick a cell for the mine
-            x = random.randint(0, self.row_cell_num - 1)
-            y = random.randint(0, self.column_cell_num - 1)
-
-            # Avoid placing a mine on the safe cell or on an already mined cell
-            if (x, y) not in safe_zone and not self.cells[x][y].is_mined:
-                self.cells[x][y].is_mined = True
-                mines_to_place -= 1
-
-        # After placing mines, calculate the number of adjacent mines for each cell
-        for x in range(self.row_cell_num):
-            for y in range(self.column_cell_num):
-                self.cells[x][y].mines_around = self.count_mines_around(x, y)
+        self.board.place_mines(safe_x, safe_y)
 
     def count_mines_around(self, x, y):
         """
@@ -60,135 +68,193 @@ class Grid:
         :param y: Y coordinate of the cell
         :return: Number of mines surrounding the cell
         """
-        count = 0
-        for dx in range(-1, 2):
-            for dy in range(-1, 2):
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.row_cell_num and 0 <= ny < self.column_cell_num:
-                    if self.cells[nx][ny].is_mined:
-                        count += 1
-        return count
+        return self.board.count_mines_around(x, y)
 
     def count_flags_around(self, x, y):
         """Count the number of flagged cells around a given cell."""
-        count = 0
-        for dx in range(-1, 2):
-            for dy in range(-1, 2):
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.row_cell_num and 0 <= ny < self.column_cell_num:
-                    if self.cells[nx][ny].is_flagged:
-                        count += 1
-        return count
+        return self.board.count_flags_around(x, y)
 
     def reveal_cell(self, x, y):
         """
         Reveal a specific cell and trigger further actions if needed.
         :param x: X coordinate of the cell to reveal
         :param y: Y coordinate of the cell to reveal
-        :return: True if the revealed cell contains a mine, False otherwise
+        :return: True if a revealed cell contains a mine, False otherwise
         """
+        if not self.started:
+            # Boards replayed from a layout already hold their mines
+            self.started = True
+            if self.on_start is not None:
+                self.on_start()
         if not self.mines_placed:
-            self.game.topbar.start_timer()
             self.place_mines(x, y)
-            self.mines_placed = True
 
-        if self.cells[x][y].reveal():
+        hit, revealed = self.board.reveal_cell(x, y)
+        self.update_cells(revealed)
+        if self.solver is not None:
+            self.solver.update(revealed)
+        if hit:
             self.draw_game_over()
-            return True
-
-        if self.cells[x][y].mines_around == 0:
-            self.recursive_reveal(x, y)
-        elif self.cells[x][y].mines_around == self.count_flags_around(x, y):
-            self.reveal_adjacent(x, y)
-        return False
-
-    def recursive_reveal(self, x, y):
-        """Recursively reveal all adjacent cells to a cell with no mines around."""
-        for dx in range(-1, 2):
-            for dy in range(-1, 2):
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.row_cell_num and 0 <= ny < self.column_cell_num:
-                    cell = self.cells[nx][ny]
-                    if not cell.is_revealed and not cell.is_mined:
-                        cell.reveal()
-                        if cell.mines_around == 0:
-                            self.recursive_reveal(nx, ny)
-                        elif cell.is_mined and cell.is_flagged:
-                            self.recursive_reveal(nx, ny)
-
-    def reveal_adjacent(self, x, y):
-        """Reveal all adjacent cells, including mines."""
-        for dx in range(-1, 2):
-            for dy in range(-1, 2):
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.row_cell_num and 0 <= ny < self.column_cell_num:
-                    cell = self.cells[nx][ny]
-                    if not cell.is_revealed and not cell.is_flagged:
-                        if cell.mines_around == 0:
-                            self.recursive_reveal(nx, ny)
-                        self.recursive_game_over = self.reveal_cell(cell.x, cell.y)
-                        if self.recursive_game_over:
-                            self.game.handle_game_over()
-
-    def draw(self, parent_frame, on_right_press, on_right_release, on_left_press, on_left_release):
-        """Draw the entire grid."""
-        for row in self.cells:
-            for cell in row:
-                cell.draw(parent_frame, on_right_press, on_right_release, on_left_press, on_left_release)
-
-    def draw_game_over(self):
-        """Update the grid display when the game is over."""
-        for row in self.cells:
-            for cell in row:
-                cell.draw_game_over()
+        return hit
+
+    def update_cells(self, indices):
+        """Schedule a repaint of the cells at the given board indices."""
+        if self.renderer is not None:
+            self.renderer.refresh(indices)
+
+    def draw(self, parent_frame, view_width, view_height, on_right_press, on_right_release, on_left_press,
+             on_left_release):
+        """
+        Draw the grid on a single canvas, scrolled when larger than the view.
+        :param parent_frame: Frame holding the canvas
+        :param view_width: Width of the canvas in pixels
+        :param view_height: Height of the canvas in pixels
+        """
+        # Imported here so that headless users of Grid need neither Tk images nor PIL
+        from renderer import CanvasRenderer
+        from sprites import get_sprites
+
+        sprites = get_sprites(parent_frame, self.cell_size)
+        self.renderer = CanvasRenderer(parent_frame, self, sprites, view_width, view_height)
+        self.renderer.draw(on_right_press, on_right_release, on_left_press, on_left_release)
+
+    def draw_game_over(self, drawn=True):
+        """
+        Update the grid display when the game is over, or no longer is after an undo.
+        Only the cells the renderer shows are repainted, the others are painted when shown.
+        """
+        if drawn == self.game_over_drawn:
+            return
+        self.game_over_drawn = drawn
+        if self.renderer is not None:
+            self.renderer.refresh_shown()
 
     def get_adjacent_cells(self, x, y):
         """Get the list of adjacent cells."""
-        adjacent_cells = []
-        for dx in range(-1, 2):
-            for dy in range(-1, 2):
-                nx, ny = x + dx, y + dy
-                if 0 <= nx < self.row_cell_num and 0 <= ny < self.column_cell_num:
-                    adjacent_cells.append(self.cells[nx][ny])
-        return adjacent_cells
+        width = self.board.width
+        return [self.cell(index % width, index // width) for index in self.board.neighbors(x, y)]
 
     def update_inspected_cells(self, x, y):
-        """Update the inspected cells by resetting old ones and adding new ones."""
-        old_inspected_cells = self.inspected_cells.copy()
-        for cell in old_inspected_cells:
-            cell.is_inspected = False
-            cell.update_button()
-
-        self.inspected_cells = set(self.get_adjacent_cells(x, y))
-        for cell in self.inspected_cells:
-            cell.is_inspected = True
-            cell.update_button()
+        """Inspect a cell and its neighbors, for a chord preview."""
+        self.set_inspected(self.board.neighbors(x, y))
 
     def update_inspected_cells_single(self, x, y):
         """Update only the inspected cell for hovering on an unrevealed cell."""
-        old_inspected_cells = self.inspected_cells.copy()
-        for cell in old_inspected_cells:
-            cell.is_inspected = False
-            cell.update_button()
+        self.set_inspected((self.board.index(x, y),))
 
-        self.inspected_cells = {self.cells[x][y]}
-        self.cells[x][y].is_inspected = True
-        self.cells[x][y].update_button()
+    def clear_inspected_cells(self):
+        """Stop inspecting cells once the left click is released."""
+        self.set_inspected(())
+
+    def set_inspected(self, indices):
+        """
+        Replace the inspected cells, repainting only the cells that enter or leave
+        the inspection. Nothing is repainted if the inspection is unchanged.
+        :param indices: Board indices of the cells to inspect
+        """
+        inspected = set(indices)
+        changed = self.inspected ^ inspected
+        if changed:
+            self.inspected = inspected
+            self.update_cells(changed)
 
     def reset_all_cells(self):
-        """Reset all cells in the grid."""
-        for row in self.cells:
-            for cell in row:
-                cell.reset()
-                cell.update_button()
-        self.mines_placed = False
+        """Reset all cells in the grid, repainting only those not showing the button."""
+        self.board.reset()
+        if self.solver is not None:
+            self.solver.reset()
+        self.started = False
+        self.inspected = set()
+        self.game_over_drawn = False
+        self.history = None
+        if self.renderer is not None:
+            self.update_cells(self.renderer.changed_cells())
+
+    def resize(self, row_cell_num, column_cell_num, mines_count, view_width, view_height, topology=None):
+        """
+        Start over on a board of another size, reusing the renderer and its canvas.
+        :param row_cell_num: Number of rows in the grid
+        :param column_cell_num: Number of columns in the grid
+        :param mines_count: Number of mines to be placed on the grid
+        :param view_width: Width of the canvas in pixels
+        :param view_height: Height of the canvas in pixels
+        :param topology: SQUARE, TORUS or HEX, the current one if None
+        """
+        self.row_cell_num = row_cell_num
+        self.column_cell_num = column_cell_num
+        self.mines_count = mines_count
+        if topology is not None:
+            self.topology = topology
+        self.board = Board(row_cell_num, column_cell_num, mines_count, debug=self.debug, seed=self.seed,
+                           topology=self.topology)
+        self.solver = None
+        self.started = False
+        self.inspected = set()
+        self.game_over_drawn = False
+        self.history = None
+        if self.renderer is not None:
+            self.renderer.resize(self.board, view_width, view_height)
+
+    def enable_history(self):
+        """Keep an undo history of the player actions, see remember."""
+        self.keep_history = True
+
+    def remember(self):
+        """
+        Record the state after a player action, if the history is enabled. It starts
+        at the first reveal, which places the mines: undoing it would deal another board.
+        """
+        if self.keep_history and self.board.mines_placed:
+            if self.history is None:
+                self.history = History(self.board.snapshot())
+            else:
+                self.history.push(self.board.snapshot(self.history.current))
+
+    def undo(self):
+        """
+        Take back the last action, even the one that lost the game.
+        :return: True if there was an action to undo
+        """
+        return self.history is not None and self.restore(self.history.undo())
+
+    def redo(self):
+        """
+        Play again the last action undone.
+        :return: True if there was an action to redo
+        """
+        return self.history is not None and self.restore(self.history.redo())
+
+    def restore(self, snapshot):
+        """
+        Bring the board back to a snapshot, repainting the cells that changed.
+        :param snapshot: Snapshot of the board, None for nothing to do
+        :return: True if the board was restored
+        """
+        if snapshot is None:
+            return False
+        self.update_cells(self.board.restore(snapshot))
+        self.set_inspected(())
+        # Rebuilt on the next hint, the solver only follows the board forward
+        self.solver = None
+        lost = self.board.mine_revealed()
+        if lost != self.game_over_drawn:
+            self.draw_game_over(lost)
+        return True
+
+    def hint(self):
+        """
+        Highlight the safest cell to reveal next. The solver is built on first use
+        and then kept up to date by reveal_cell.
+        :return: Tuple (x, y, mine probability), or None if there is nothing to suggest
+        """
+        if self.solver is None:
+            self.solver = Solver(self.board)
+            self.solver.rebuild()
+        hint = self.solver.hint()
+        if hint is not None and self.renderer is not None:
+            self.renderer.show_hint(hint[0], hint[1])
+        return hint
 
     def check_victory(self):
         """Check if all mines are correctly flagged."""
-        for row in self.cells:
-            for cell in row:
-                if cell.is_mined and not cell.is_flagged:
-                    return False
-                if not cell.is_mined and cell.is_flagged:
-                    return False
-        return True
+        return self.board.check_victory()
@@ -0,0 +1,337 @@
+import os
+import random
+import sqlite3
+import tempfile
+import zlib
+from collections import OrderedDict, deque
+from board import MINED, REVEALED, FLAGGED, QUESTIONED, _MINE_TABLE
+from topology import count_padded
+
+# Side of a square chunk, in cells
+CHUNK_SIZE = 32
+# Probability of a cell holding a mine, rounded to a multiple of 1/256
+DENSITY = 0.2
+# Chunks kept in memory before the least recently used one is evicted
+MAX_CHUNKS = 256
+# Cells a single reveal may open, since sparse boards can have unbounded empty areas.
+# Clicking a revealed empty cell at the edge of a cut flood carries it on.
+FLOOD_LIMIT = 1 << 20
+# Evicted chunks written before the store commits
+COMMIT_EVERY = 64
+
+# Keeps the player bits of a state byte, mines are regenerated from the seed
+_PLAYER_TABLE = bytes(state & (REVEALED | FLAGGED | QUESTIONED) for state in range(256))
+
+
+class Chunk:
+    __slots__ = ("state", "mines_around", "dirty")
+
+    def __init__(self, state, mines_around):
+        """
+        Initialize a materialized chunk.
+        :param state: One byte of MINED/REVEALED/FLAGGED/QUESTIONED bits per cell, row by row
+        :param mines_around: Mines in the 3x3 block of each cell, across chunk borders
+        """
+        self.state = state
+        self.mines_around = mines_around
+        # True once the player changed the chunk, so it must be stored on eviction
+        self.dirty = False
+
+
+class ChunkStore:
+    def __init__(self, path):
+        """
+        Initialize an on-disk store of evicted chunks, in a SQLite file.
+        Only the player bits are stored, compressed; mines come back from the seed.
+        :param path: Path of the database file
+        """
+        self.connection = sqlite3.connect(path)
+        # Chunks can always be rebuilt from the seed, durability is not worth an fsync per commit
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute("PRAGMA synchronous=NORMAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS chunks (cx INTEGER, cy INTEGER, state BLOB, PRIMARY KEY (cx, cy)) WITHOUT ROWID"
+        )
+        self.pending = 0
+
+    def save(self, cx, cy, state):
+        """Store the player bits of a chunk."""
+        self.connection.execute(
+            "INSERT OR REPLACE INTO chunks VALUES (?, ?, ?)", (cx, cy, zlib.compress(state.translate(_PLAYER_TABLE)))
+        )
+        self.pending += 1
+        if self.pending >= COMMIT_EVERY:
+            self.commit()
+
+    def load(self, cx, cy):
+        """
+        Read back the player bits of a chunk.
+        :return: Bytes of the chunk state without mines, None if it was never stored
+        """
+        row = self.connection.execute("SELECT state FROM chunks WHERE cx = ? AND cy = ?", (cx, cy)).fetchone()
+        return zlib.decompress(row[0]) if row else None
+
+    def commit(self):
+        self.connection.commit()
+        self.pending = 0
+
+    def close(self):
+        self.commit()
+        self.connection.close()
+
+
+class InfiniteBoard:
+    def __init__(self, seed=None, density=DENSITY, max_chunks=MAX_CHUNKS, store_path=None):
+        """
+        Initialize an unbounded board, generated chunk by chunk.
+        The mines of a chunk only depend on the seed and the chunk coordinates, so a
+        chunk is built when first touched and can be dropped and rebuilt at will.
+        At most max_chunks chunks are kept in memory; least recently used ones are
+        evicted, and those the player changed are written to a chunk store.
+        This is a headless engine, e.g. for solvers and benchmarks, not a mode of
+        the Tk game, whose grid and renderer need a board of known size. Its rules
+        are those of Board, without a flag limit or a victory as mines are unbounded.
+        :param seed: Seed of the whole board, a random one is drawn if None
+        :param density: Probability of a cell holding a mine
+        :param max_chunks: Chunks kept in memory, at least 9
+        :param store_path: SQLite file for evicted chunks, a temporary file if None
+        """
+        self.seed = seed if seed is not None else random.randrange(1 << 63)
+        # Random bytes below the threshold are mines
+        threshold = round(density * 256)
+        self.mine_table = bytes(MINED if value < threshold else 0 for value in range(256))
+        self.max_chunks = max(9, max_chunks)
+        self.chunks = OrderedDict()
+        self.layouts = OrderedDict()
+
+        self.temporary = store_path is None
+        if self.temporary:
+            handle, store_path = tempfile.mkstemp(suffix=".sqlite")
+            os.close(handle)
+        self.store_path = store_path
+        self.store = ChunkStore(store_path)
+
+        # The 3x3 block around the first click never holds mines
+        self.first_click = None
+        self.safe_zone = frozenset()
+        self.revealed_count = 0
+        self.flags_count = 0
+
+    def _layout(self, cx, cy):
+        """Generate the mines of a chunk as one byte per cell, MINED or 0."""
+        rng = random.Random(f"{self.seed}/{cx}/{cy}")
+        layout = bytearray(rng.randbytes(CHUNK_SIZE * CHUNK_SIZE).translate(self.mine_table))
+        for x, y in self.safe_zone:
+            if x // CHUNK_SIZE == cx and y // CHUNK_SIZE == cy:
+                layout[(y % CHUNK_SIZE) * CHUNK_SIZE + x % CHUNK_SIZE] = 0
+        return layout
+
+    def _mines(self, cx, cy):
+        """Return the mines of a chunk, from memory if it is loaded."""
+        chunk = self.chunks.get((cx, cy))
+        if chunk is not None:
+            return chunk.state.translate(_MINE_TABLE)
+        # Neighbor layouts are generated for every chunk built, keep the recent ones
+        layout = self.layouts.get((cx, cy))
+        if layout is None:
+            layout = self.layouts[(cx, cy)] = self._layout(cx, cy)
+            if len(self.layouts) > self.max_chunks:
+                self.layouts.popitem(last=False)
+        return layout
+
+    def chunk(self, cx, cy):
+        """
+        Return a chunk, building it if needed and marking it as recently used.
+        :param cx: X coordinate of the chunk, in chunks
+        :param cy: Y coordinate of the chunk, in chunks
+        """
+        key = (cx, cy)
+        chunk = self.chunks.get(key)
+        if chunk is not None:
+            self.chunks.move_to_end(key)
+            return chunk
+
+        state = self._layout(cx, cy)
+        stored = self.store.load(cx, cy)
+        if stored is not None:
+            merged = int.from_bytes(state, "little") | int.from_bytes(stored, "little")
+            state = bytearray(merged.to_bytes(len(state), "little"))
+        chunk = Chunk(state, self._count_mines(cx, cy, state))
+        self.chunks[key] = chunk
+        while len(self.chunks) > self.max_chunks:
+            self._evict()
+        return chunk
+
+    def _count_mines(self, cx, cy, state):
+        """
+        Count the mines around every cell of a chunk, padding it with the border
+        cells of the 8 chunks around it, see count_padded.
+        """
+        size = CHUNK_SIZE
+        around = {
+            (dx, dy): self._mines(cx + dx, cy + dy) if (dx, dy) != (0, 0) else state.translate(_MINE_TABLE)
+            for dx in (-1, 0, 1) for dy in (-1, 0, 1)
+        }
+
+        def row(dy, y):
+            left, middle, right = around[(-1, dy)], around[(0, dy)], around[(1, dy)]
+            start = y * size
+            return left[start + size - 1:start + size] + middle[start:start + size] + right[start:start + 1]
+
+        padded = b"".join(
+            [row(-1, size - 1)] + [row(0, y) for y in range(size)] + [row(1, 0)]
+        )
+        return count_padded(padded, size, size)
+
+    def _evict(self):
+        """Drop the least recently used chunk, storing it if the player changed it."""
+        (cx, cy), chunk = self.chunks.popitem(last=False)
+        if chunk.dirty:
+            self.store.save(cx, cy, chunk.state)
+
+    def _locate(self, x, y):
+        """Return the chunk holding a cell and the index of the cell in it."""
+        cx, lx = divmod(x, CHUNK_SIZE)
+        cy, ly = divmod(y, CHUNK_SIZE)
+        return self.chunk(cx, cy), ly * CHUNK_SIZE + lx
+
+    def state(self, x, y):
+        """Return the state bits of a cell."""
+        chunk, index = self._locate(x, y)
+        return chunk.state[index]
+
+    def mines_around(self, x, y):
+        """Return the number of mines in the 3x3 block centered on a cell."""
+        chunk, index = self._locate(x, y)
+        return chunk.mines_around[index]
+
+    def is_mined(self, x, y):
+        return bool(self.state(x, y) & MINED)
+
+    def is_revealed(self, x, y):
+        return bool(self.state(x, y) & REVEALED)
+
+    def is_flagged(self, x, y):
+        return bool(self.state(x, y) & FLAGGED)
+
+    def count_flags_around(self, x, y):
+        """Count the flagged cells in the 3x3 block centered on a cell."""
+        return sum(
+            1 for dx in (-1, 0, 1) for dy in (-1, 0, 1) if self.state(x + dx, y + dy) & FLAGGED
+        )
+
+    def _open(self, x, y):
+        """
+        Reveal one cell if it is neither flagged nor revealed.
+        :return: The state of the cell before, None if it was not opened
+        """
+        chunk, index = self._locate(x, y)
+        cell = chunk.state[index]
+        if cell & (REVEALED | FLAGGED):
+            return None
+        chunk.state[index] = cell | REVEALED
+        chunk.dirty = True
+        self.revealed_count += 1
+        return cell
+
+    def reveal_cell(self, x, y):
+        """
+        Reveal a cell, open the area around empty cells and chord satisfied numbers.
+        The rules and the order are those of Board.reveal_cell: the clicked cell and
+        the numbers a chord reveals are chorded when their mines are all flagged,
+        depth first, while a flood only spreads over empty cells.
+        The first reveal of a board keeps its 3x3 block free of mines.
+        :param x: X coordinate of the cell to reveal
+        :param y: Y coordinate of the cell to reveal
+        :return: Tuple (mine hit, list of the newly revealed (x, y) cells)
+        """
+        if self.first_click is None:
+            self._start(x, y)
+
+        hit = False
+        revealed = []
+        chords = []
+        target = (x, y)
+        while True:
+            if target is not None:
+                tx, ty = target
+                cell = self.state(tx, ty)
+                if self._open(tx, ty) is not None:
+                    revealed.append(target)
+                if cell & MINED and not cell & FLAGGED:
+                    hit = True
+                elif self.mines_around(tx, ty) == 0:
+                    # Also expands a revealed empty cell whose flood was cut by FLOOD_LIMIT
+                    self._flood(tx, ty, revealed)
+                elif self._satisfied(tx, ty):
+                    chords.append(iter([(tx + dx, ty + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]))
+                target = None
+
+            if not chords:
+                break
+            for nx, ny in chords[-1]:
+                if not self.state(nx, ny) & (REVEALED | FLAGGED):
+                    if self.mines_around(nx, ny) == 0:
+                        self._flood(nx, ny, revealed)
+                    target = (nx, ny)
+                    break
+            else:
+                chords.pop()
+        return hit, revealed
+
+    def _flood(self, x, y, revealed):
+        """
+        Open the safe cells connected to an empty cell through empty cells, breadth
+        first across chunks, until FLOOD_LIMIT cells are revealed in all.
+        :param revealed: List the newly revealed (x, y) cells are appended to
+        """
+        queue = deque((x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+        while queue and len(revealed) < FLOOD_LIMIT:
+            nx, ny = queue.popleft()
+            cell = self._open(nx, ny)
+            if cell is None:
+                continue
+            revealed.append((nx, ny))
+            if self.mines_around(nx, ny) == 0:
+                queue.extend((nx + dx, ny + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+
+    def _satisfied(self, x, y):
+        """Return True if a number has as many flags around it as mines, so it can be chorded."""
+        count = self.mines_around(x, y)
+        return count > 0 and count == self.count_flags_around(x, y)
+
+    def _start(self, x, y):
+        """Clear the mines around the first click, rebuilding the chunks already loaded."""
+        self.first_click = (x, y)
+        self.safe_zone = frozenset((x + dx, y + dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+        self.layouts.clear()
+        while self.chunks:
+            self._evict()
+
+    def toggle_flag(self, x, y):
+        """
+        Cycle an unrevealed cell through flag, question mark and blank.
+        :return: True if the cell state changed, False otherwise
+        """
+        chunk, index = self._locate(x, y)
+        cell = chunk.state[index]
+        if cell & REVEALED:
+            return False
+        if not cell & (FLAGGED | QUESTIONED):
+            chunk.state[index] = cell | FLAGGED
+            self.flags_count += 1
+        elif cell & FLAGGED:
+            chunk.state[index] = (cell & ~FLAGGED) | QUESTIONED
+            self.flags_count -= 1
+        else:
+            chunk.state[index] = cell & ~QUESTIONED
+        chunk.dirty = True
+        return True
+
+    def close(self):
+        """Write the loaded chunks to the store and close it, deleting a temporary store."""
+        while self.chunks:
+            self._evict()
+        self.store.close()
+        if self.temporary:
+            os.remove(self.store_path)
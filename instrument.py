@@ -0,0 +1,196 @@
+import cProfile
+import json
+import os
+import time
+from array import array
+
+# Upper bounds of the latency histogram buckets, in milliseconds
+BUCKETS = (1, 2, 4, 8, 16, 33, 50, 100, 200, 500, 1000, float("inf"))
+
+
+class Instrumentation:
+    def __init__(self, capacity=4096, profile_dir=None):
+        """
+        Initialize the input-to-paint latency recorder.
+        Nothing is wrapped or timed until attach() and wrap_handler() are called,
+        so a game without instrumentation pays nothing for it.
+        :param capacity: Number of events kept in the ring buffer
+        :param profile_dir: Directory receiving one cProfile dump per game, None to not profile
+        """
+        self.capacity = capacity
+        # Ring buffer of the last events: name, latency in ms and canvas items reconfigured
+        self.names = [None] * capacity
+        self.latencies = array("d", bytes(8 * capacity))
+        self.reconfigured = array("l", bytes(array("l").itemsize * capacity))
+        self.count = 0
+
+        # Smallest difference seen between our clock and the event timestamps.
+        # Tk event times come from the X server clock, so latencies are measured
+        # from the event time shifted by this offset.
+        self.offset = None
+        # Events handled but not painted yet: (name, time of the event on our clock)
+        self.waiting = []
+        # Events whose handler only scheduled the work, completed by handled()
+        self.deferred = []
+        self.renderer = None
+        # Function name -> calls, total and longest duration in ns
+        self.spans = {}
+
+        self.profile_dir = profile_dir
+        self.profiler = None
+        self.games = 0
+
+    def attach(self, game):
+        """Time the grid operations and the repaints of a game, and start profiling it."""
+        grid = game.grid
+        for name in ("reveal_cell", "draw_game_over", "update_cells"):
+            setattr(grid, name, self.timed(name, getattr(grid, name)))
+        self.renderer = grid.renderer
+        flush = self.renderer.flush
+
+        def timed_flush():
+            before = self.renderer.reconfigured
+            flush()
+            self.painted(self.renderer.reconfigured - before)
+
+        self.renderer.flush = self.timed("flush", timed_flush)
+        self.new_game()
+
+    def timed(self, name, function):
+        """Wrap a function to record how long its calls take."""
+        spans = self.spans
+        spans[name] = [0, 0, 0]
+
+        def wrapped(*args, **kwargs):
+            start = time.perf_counter_ns()
+            try:
+                return function(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter_ns() - start
+                span = spans[name]
+                span[0] += 1
+                span[1] += elapsed
+                if elapsed > span[2]:
+                    span[2] = elapsed
+        return wrapped
+
+    def wrap_handler(self, name, handler, deferred=False):
+        """
+        Wrap an event handler, whose last argument is the Tk event, to measure its latency.
+        :param deferred: True if the handler only schedules the work, which then calls handled()
+        """
+        handler = self.timed(name, handler)
+
+        def wrapped(*args):
+            self.begin(name, args[-1], deferred)
+            try:
+                return handler(*args)
+            finally:
+                if not deferred:
+                    self.end()
+        return wrapped
+
+    def begin(self, name, event, deferred=False):
+        """Record that an event is being handled, or that its work is scheduled if deferred."""
+        now = time.perf_counter_ns() / 1e6
+        event_time = getattr(event, "time", 0)
+        if event_time:
+            if self.offset is None or now - event_time < self.offset:
+                self.offset = now - event_time
+            now = event_time + self.offset
+        (self.deferred if deferred else self.waiting).append((name, now))
+
+    def handled(self):
+        """Complete the deferred events once the work they scheduled ran, at the next repaint if any."""
+        self.waiting.extend(self.deferred)
+        self.deferred.clear()
+        self.end()
+
+    def end(self):
+        """Complete the events at once if their handler left nothing to repaint."""
+        if self.renderer is None or not self.renderer.flush_pending:
+            self.painted(0)
+
+    def painted(self, reconfigured):
+        """Complete the events waiting for a repaint."""
+        now = time.perf_counter_ns() / 1e6
+        for name, start in self.waiting:
+            slot = self.count % self.capacity
+            self.names[slot] = name
+            self.latencies[slot] = now - start
+            self.reconfigured[slot] = reconfigured
+            self.count += 1
+        self.waiting.clear()
+
+    def events(self):
+        """Return the events kept in the ring buffer as (name, latency ms, reconfigured), oldest first."""
+        kept = min(self.count, self.capacity)
+        first = self.count - kept
+        return [
+            (self.names[slot], self.latencies[slot], self.reconfigured[slot])
+            for slot in (number % self.capacity for number in range(first, self.count))
+        ]
+
+    def histogram(self, name=None):
+        """
+        Count the latencies of the kept events per bucket.
+        :param name: Event name to restrict to, all events if None
+        :return: List of (bucket upper bound in ms, count)
+        """
+        counts = [0] * len(BUCKETS)
+        for event_name, latency, _ in self.events():
+            if name is None or event_name == name:
+                counts[next(i for i, bound in enumerate(BUCKETS) if latency <= bound)] += 1
+        return list(zip(BUCKETS, counts))
+
+    def report(self):
+        """Summarize the kept events per name, and the timed functions."""
+        by_name = {}
+        for name, latency, reconfigured in self.events():
+            by_name.setdefault(name, []).append((latency, reconfigured))
+        events = {}
+        for name, values in by_name.items():
+            latencies = sorted(latency for latency, _ in values)
+            events[name] = {
+                "count": len(values),
+                "p50_ms": latencies[len(latencies) // 2],
+                "p99_ms": latencies[min(len(latencies) - 1, len(latencies) * 99 // 100)],
+                "max_ms": latencies[-1],
+                "reconfigured_mean": sum(r for _, r in values) / len(values),
+                "histogram": {str(bound): count for bound, count in self.histogram(name)},
+            }
+        spans = {
+            name: {"calls": calls, "total_ms": total / 1e6, "max_ms": longest / 1e6}
+            for name, (calls, total, longest) in self.spans.items() if calls
+        }
+        return {"events": events, "spans": spans}
+
+    def export(self, path):
+        """Write the report as JSON."""
+        with open(path, "w") as file:
+            json.dump(self.report(), file, indent=2)
+
+    def new_game(self):
+        """Start profiling a new game, dropping the profile of an unfinished one."""
+        if self.profile_dir is None:
+            return
+        if self.profiler is not None:
+            self.profiler.disable()
+        self.profiler = cProfile.Profile()
+        self.profiler.enable()
+
+    def game_finished(self):
+        """Dump the profile of the finished game, if profiling."""
+        if self.profiler is None:
+            return
+        self.profiler.disable()
+        self.games += 1
+        os.makedirs(self.profile_dir, exist_ok=True)
+        self.profiler.dump_stats(os.path.join(self.profile_dir, f"game-{os.getpid()}-{self.games}.prof"))
+        self.profiler = None
+
+    def close(self):
+        """Stop profiling."""
+        if self.profiler is not None:
+            self.profiler.disable()
+            self.profiler = None
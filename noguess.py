@@ -0,0 +1,227 @@
+import multiprocessing
+import os
+import queue
+import random
+import threading
+import time
+from concurrent.futures import CancelledError, Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from board import Board, MINED, REVEALED
+from solver import Solver
+from topology import SQUARE
+
+
+def solves_without_guessing(board, x, y):
+    """
+    Play a board from its first click, only ever revealing cells the solver proves safe.
+    :param board: Board with its mines placed, nothing revealed yet
+    :param x: X coordinate of the first click
+    :param y: Y coordinate of the first click
+    :return: True if every safe cell gets revealed
+    """
+    solver = Solver(board)
+    hit, revealed = board.reveal_cell(x, y)
+    solver.update(revealed)
+    while board.hidden_safe and not hit:
+        safe = sorted(solver.safe)
+        if not safe and len(solver.mines) == board.mines_count:
+            # Every mine is known, whatever is left is safe
+            state = board.state
+            safe = [
+                index for index in range(board.size)
+                if not state[index] & (MINED | REVEALED) and index not in solver.mines
+            ]
+        if not safe:
+            return False
+        for index in safe:
+            if board.state[index] & REVEALED:
+                continue
+            hit, revealed = board.reveal_cell(*board.coords(index))
+            solver.update(revealed)
+    return not hit
+
+
+def _candidate(width, height, mines_count, x, y, seed, topology):
+    """Check one seeded layout in a worker process."""
+    board = Board(width, height, mines_count, seed=seed, topology=topology)
+    board.place_mines(x, y)
+    return solves_without_guessing(board, x, y)
+
+
+class NoGuessGenerator:
+    def __init__(self, workers=None, queue_size=2):
+        """
+        Initialize a generator of boards that can be cleared without guessing.
+        Candidate seeds are checked in parallel by a process pool, and a background
+        thread keeps a few boards ready for the current preset, opened from its
+        center cell.
+        :param workers: Number of worker processes, one per core if None
+        :param queue_size: Number of boards kept ready
+        """
+        self.workers = workers or os.cpu_count() or 1
+        self.pool = None
+        # (width, height, mines, topology) -> generated, accepted and seconds spent
+        self.stats = {}
+        self.lock = threading.Lock()
+
+        self.ready = queue.Queue(maxsize=queue_size)
+        self.preset = None
+        self.wake = threading.Event()
+        self.closed = False
+        self.thread = None
+
+    def _pool(self):
+        """Start the worker processes on first use, never once closed."""
+        with self.lock:
+            if self.pool is None and not self.closed:
+                # Spawned workers do not inherit the Tk interpreter or the threads
+                context = multiprocessing.get_context("spawn")
+                self.pool = ProcessPoolExecutor(self.workers, mp_context=context)
+            return self.pool
+
+    def generate(self, width, height, mines_count, x, y, topology=SQUARE):
+        """
+        Check batches of random seeds in parallel until one gives a no-guess board.
+        :param topology: SQUARE, TORUS or HEX
+        :return: Seed that, placed from the first click (x, y), gives a no-guess board, None once closed
+        """
+        pool = self._pool()
+        if pool is None:
+            return None
+        start = time.perf_counter()
+        generated = 0
+        accepted = 0
+        found = None
+        while found is None and not self.closed:
+            seeds = [random.randrange(1 << 63) for _ in range(self.workers * 2)]
+            try:
+                futures = [pool.submit(_candidate, width, height, mines_count, x, y, seed, topology) for seed in seeds]
+                results = [future.result() for future in futures]
+            except BrokenProcessPool:
+                raise
+            except (CancelledError, RuntimeError):
+                # The pool was shut down by close from another thread, or by the interpreter exiting
+                break
+            for seed, result in zip(seeds, results):
+                generated += 1
+                if result:
+                    accepted += 1
+                    if found is None:
+                        found = seed
+
+        with self.lock:
+            stats = self.stats.setdefault((width, height, mines_count, topology), [0, 0, 0.0])
+            stats[0] += generated
+            stats[1] += accepted
+            stats[2] += time.perf_counter() - start
+        return found
+
+    def start_cell(self, width, height):
+        """Return the cell pre-generated boards are opened from."""
+        return width // 2, height // 2
+
+    def set_preset(self, width, height, mines_count, topology=SQUARE):
+        """Keep boards of another size or topology ready, dropping the queued ones."""
+        if self.preset == (width, height, mines_count, topology):
+            return
+        self.preset = (width, height, mines_count, topology)
+        while True:
+            try:
+                self.ready.get_nowait()
+            except queue.Empty:
+                break
+        if self.thread is None:
+            self.thread = threading.Thread(target=self._fill, daemon=True)
+            self.thread.start()
+        self.wake.set()
+
+    def _fill(self):
+        """Background loop keeping the queue of ready boards full."""
+        while not self.closed:
+            preset = self.preset
+            if preset is None or self.ready.full():
+                self.wake.wait(0.5)
+                self.wake.clear()
+                continue
+            width, height, mines_count, topology = preset
+            x, y = self.start_cell(width, height)
+            seed = self.generate(width, height, mines_count, x, y, topology)
+            if seed is not None and preset == self.preset:
+                try:
+                    self.ready.put_nowait((preset, seed))
+                except queue.Full:
+                    pass
+
+    def take(self, width, height, mines_count, x, y, topology=SQUARE):
+        """
+        Return a no-guess board for a first click without blocking the caller.
+        A queued board is used if the click lands on its start cell or in the empty
+        area opened from it, since the game then plays out the same; otherwise a
+        board is generated for the click by another thread, and the queued board is
+        kept for a later game.
+        :return: concurrent.futures.Future of a tuple (seed, start x, start y) to place
+            the mines from, whose seed is None if the generator was closed meanwhile
+        """
+        future = Future()
+        preset = (width, height, mines_count, topology)
+        start_x, start_y = self.start_cell(width, height)
+        while True:
+            try:
+                queued, seed = self.ready.get_nowait()
+            except queue.Empty:
+                break
+            if queued != preset:
+                continue
+            if self._opens(preset, seed, start_x, start_y, x, y):
+                self.wake.set()
+                future.set_result((seed, start_x, start_y))
+                return future
+            try:
+                self.ready.put_nowait((queued, seed))
+            except queue.Full:
+                pass
+            break
+
+        def run():
+            try:
+                future.set_result((self.generate(width, height, mines_count, x, y, topology), x, y))
+            except Exception as error:
+                future.set_exception(error)
+
+        threading.Thread(target=run, daemon=True).start()
+        return future
+
+    @staticmethod
+    def _opens(preset, seed, start_x, start_y, x, y):
+        """Check if clicking (x, y) opens the same area as clicking the start cell."""
+        if (x, y) == (start_x, start_y):
+            return True
+        width, height, mines_count, topology = preset
+        board = Board(width, height, mines_count, seed=seed, topology=topology)
+        board.place_mines(start_x, start_y)
+        index = board.index(x, y)
+        _, revealed = board.reveal_cell(start_x, start_y)
+        return board.mines_around[index] == 0 and index in revealed
+
+    def report(self):
+        """
+        Summarize the generation speed per preset.
+        :return: Dict (width, height, mines, topology) -> boards checked per second and rejection rate
+        """
+        with self.lock:
+            return {
+                preset: {
+                    "boards_per_second": generated / seconds if seconds else 0.0,
+                    "rejection_rate": 1 - accepted / generated if generated else 0.0,
+                }
+                for preset, (generated, accepted, seconds) in self.stats.items()
+            }
+
+    def close(self):
+        """Stop the background thread and the worker processes."""
+        self.closed = True
+        self.wake.set()
+        with self.lock:
+            if self.pool is not None:
+                self.pool.shutdown(wait=False, cancel_futures=True)
+                self.pool = None
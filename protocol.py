@@ -0,0 +1,96 @@
+import struct
+
+# Every message is a frame: payload length, message type, then the payload
+FRAME = struct.Struct("<IB")
+
+# Requests of the client
+NEW = 1
+REVEAL = 2
+FLAG = 3
+RESET = 4
+# Replies of the server
+STARTED = 16
+DELTA = 17
+ERROR = 18
+
+# NEW and STARTED payload: width, height, mines, topology as an index into
+# topology.TOPOLOGIES, and seed, -1 for a random one
+NEW_GAME = struct.Struct("<IIIBq")
+# REVEAL and FLAG payload: x and y of the cell
+CELL = struct.Struct("<II")
+# DELTA payload: game status, flags left and number of runs, then the runs as
+# (first index, length) pairs, then one sprite code per cell of the runs
+DELTA_HEADER = struct.Struct("<BiI")
+RUN = struct.Struct("<II")
+
+# Game status of a DELTA
+PLAYING = 0
+WON = 1
+LOST = 2
+
+# Largest request payload accepted by the server
+MAX_REQUEST = 64
+
+
+async def read_frame(reader, limit=None):
+    """
+    Read one frame.
+    :param reader: asyncio.StreamReader
+    :param limit: Largest payload accepted, None for any
+    :return: Tuple (message type, payload)
+    :raise ValueError: If the payload is larger than the limit
+    :raise asyncio.IncompleteReadError: If the connection closes mid-frame
+    """
+    length, kind = FRAME.unpack(await reader.readexactly(FRAME.size))
+    if limit is not None and length > limit:
+        raise ValueError(f"Frame of {length} bytes, at most {limit} accepted")
+    return kind, await reader.readexactly(length) if length else b""
+
+
+def frame(kind, payload=b""):
+    """Return the bytes of one frame."""
+    return FRAME.pack(len(payload), kind) + payload
+
+
+def encode_delta(status, flags_left, indices, codes):
+    """
+    Encode the cells whose sprite changed. Consecutive indices are grouped into runs,
+    so the large areas opened by a flood fill cost about one byte per cell.
+    :param status: PLAYING, WON or LOST
+    :param flags_left: Mines minus flags placed
+    :param indices: Sorted indices of the changed cells
+    :param codes: New sprite code of each changed cell, in the same order
+    :return: Bytes of a DELTA payload
+    """
+    runs = []
+    start = previous = None
+    for index in indices:
+        if previous is None or index != previous + 1:
+            if start is not None:
+                runs += (start, previous - start + 1)
+            start = index
+        previous = index
+    if start is not None:
+        runs += (start, previous - start + 1)
+    return (
+        DELTA_HEADER.pack(status, flags_left, len(runs) // 2)
+        + struct.pack(f"<{len(runs)}I", *runs)
+        + bytes(codes)
+    )
+
+
+def apply_delta(payload, shown):
+    """
+    Apply a DELTA payload to a client copy of the board.
+    :param payload: Bytes of the DELTA payload
+    :param shown: Bytearray holding the sprite code of every cell, updated in place
+    :return: Tuple (status, flags left, number of changed cells)
+    """
+    status, flags_left, run_count = DELTA_HEADER.unpack_from(payload)
+    runs = struct.unpack_from(f"<{2 * run_count}I", payload, DELTA_HEADER.size)
+    position = DELTA_HEADER.size + RUN.size * run_count
+    for start, length in zip(runs[::2], runs[1::2]):
+        shown[start:start + length] = payload[position:position + length]
+        position += length
+    return status, flags_left, position - DELTA_HEADER.size - RUN.size * run_count
+
@@ -0,0 +1,338 @@
+import tkinter as tk
+from array import array
+from spritecodes import BUTTON, not_buttons, sprite_code
+from sprites import get_sprites
+from topology import HEX
+
+# Cell sizes of the zoom levels, in pixels
+ZOOM_SIZES = (10, 15, 20, 30, 40, 60)
+# Cells drawn beyond each side of the visible area, so small scrolls reuse painted items
+MARGIN = 2
+# Pixels scrolled per mouse wheel step
+SCROLL_STEP = 60
+# Sprite code of a pool slot showing no cell yet
+_NO_CODE = 255
+
+
+class CanvasRenderer:
+    def __init__(self, parent_frame, grid, sprites, view_width, view_height):
+        """
+        Initialize a renderer drawing the grid on a single scrollable, zoomable canvas.
+        Only the cells in view, plus a small margin, have an image item. Items form
+        a pool of cols x rows slots, cell (x, y) using slot (x % cols, y % rows), so
+        the items of cells scrolled out of view are exactly those the cells scrolled
+        into view need. Hex boards are drawn as offset rows, odd rows shifted right
+        by half a cell, so that every cell touches its 6 neighbors.
+        :param parent_frame: Parent widget (the game grid frame)
+        :param grid: Grid whose board is drawn
+        :param sprites: Shared sprite set
+        :param view_width: Width of the visible area in pixels
+        :param view_height: Height of the visible area in pixels
+        """
+        self.grid = grid
+        self.board = grid.board
+        self.cell_size = grid.cell_size
+        self.sprites = sprites
+        self.view_width = view_width
+        self.view_height = view_height
+        self.canvas = tk.Canvas(
+            parent_frame,
+            width=view_width,
+            height=view_height,
+            borderwidth=0,
+            highlightthickness=0,
+            xscrollincrement=1,
+            yscrollincrement=1,
+            xscrollcommand=lambda first, last: self.scrolled(self.x_scrollbar, first, last),
+            yscrollcommand=lambda first, last: self.scrolled(self.y_scrollbar, first, last),
+        )
+        self.canvas.grid(row=0, column=0, padx=0, pady=0)
+        self.x_scrollbar = tk.Scrollbar(parent_frame, orient="horizontal", command=self.canvas.xview)
+        self.y_scrollbar = tk.Scrollbar(parent_frame, orient="vertical", command=self.canvas.yview)
+        self.x_scrollbar.grid(row=1, column=0, sticky="ew")
+        self.y_scrollbar.grid(row=0, column=1, sticky="ns")
+
+        # Created before the cell items so that their ids stay consecutive
+        self.hint_item = self.canvas.create_rectangle(0, 0, 0, 0, outline="red", width=2, state="hidden")
+        self.hint_shown = False
+
+        # Indices waiting for a repaint, flushed once per event-loop tick
+        self.dirty = set()
+        self.flush_pending = False
+        self.view_pending = False
+
+        # Pool of image items with consecutive ids, the item of a slot is first_item + slot
+        self.first_item = None
+        self.item_count = 0
+        self.cols = self.rows = 0
+        # Horizontal offset of the odd rows, in pixels
+        self.shift = 0
+        # Cell index and sprite code shown by each slot
+        self.slot_cell = array("l")
+        self.slot_code = bytearray()
+        # Cells covered by the pool: columns x0 to x1 and rows y0 to y1, excluded
+        self.view = (0, 0, 0, 0)
+        # Total number of canvas items reconfigured, read by the instrumentation
+        self.reconfigured = 0
+
+    def draw(self, on_right_press, on_right_release, on_left_press, on_left_release):
+        """Lay out the cells and bind the mouse buttons, wheel and pan on the canvas."""
+        self.layout()
+        canvas = self.canvas
+        canvas.bind("<ButtonPress-1>", lambda event: self.dispatch(on_left_press, event))
+        canvas.bind("<ButtonRelease-1>", lambda event: on_left_release(self.cell_at(event.x, event.y), event))
+        canvas.bind("<ButtonPress-3>", lambda event: self.dispatch(on_right_press, event))
+        canvas.bind("<ButtonRelease-3>", lambda event: on_right_release(self.cell_at(event.x, event.y), event))
+
+        # Wheel scrolls, Shift+wheel scrolls sideways, Ctrl+wheel zooms on the pointer
+        canvas.bind("<MouseWheel>", lambda event: self.wheel(event, "y", event.delta))
+        canvas.bind("<Shift-MouseWheel>", lambda event: self.wheel(event, "x", event.delta))
+        canvas.bind("<Control-MouseWheel>", lambda event: self.wheel(event, "zoom", event.delta))
+        for button, delta in (("4", 1), ("5", -1)):
+            canvas.bind(f"<Button-{button}>", lambda event, d=delta: self.wheel(event, "y", d))
+            canvas.bind(f"<Shift-Button-{button}>", lambda event, d=delta: self.wheel(event, "x", d))
+            canvas.bind(f"<Control-Button-{button}>", lambda event, d=delta: self.wheel(event, "zoom", d))
+        # Middle button drags the view
+        canvas.bind("<ButtonPress-2>", lambda event: canvas.scan_mark(event.x, event.y))
+        canvas.bind("<B2-Motion>", lambda event: canvas.scan_dragto(event.x, event.y, gain=1))
+
+    def resize(self, board, view_width, view_height):
+        """
+        Show another board at the default zoom, reusing the canvas and its pool of image items.
+        :param board: The new board, possibly of another size
+        :param view_width: Width of the visible area in pixels
+        :param view_height: Height of the visible area in pixels
+        """
+        self.board = board
+        self.view_width = view_width
+        self.view_height = view_height
+        self.cell_size = self.grid.cell_size
+        self.sprites = get_sprites(self.canvas, self.cell_size)
+        self.dirty.clear()
+        self.canvas.configure(width=view_width, height=view_height)
+        self.layout()
+
+    def layout(self):
+        """
+        Size the pool of image items for the visible area, then paint the cells in view.
+        Missing items are created and surplus ones hidden in a single Tcl script.
+        Canvas ids are allocated sequentially and items are never deleted, so the
+        pool stays consecutive.
+        """
+        board = self.board
+        size = self.cell_size
+        self.shift = size // 2 if board.topology.kind == HEX else 0
+        self.canvas.configure(scrollregion=(0, 0, board.width * size + self.shift, board.height * size))
+        self.cols = min(board.width, -(-self.view_width // size) + 1 + 2 * MARGIN)
+        self.rows = min(board.height, -(-self.view_height // size) + 1 + 2 * MARGIN)
+        pool = self.cols * self.rows
+
+        canvas = str(self.canvas)
+        button = self.sprites.names[BUTTON]
+        if self.first_item is None:
+            self.first_item = int(self.canvas.create_image(0, 0, anchor="nw", image=button, state="hidden"))
+            self.item_count = 1
+        self.canvas.tk.eval(
+            f"for {{set i {self.item_count}}} {{$i < {pool}}} {{incr i}} {{\n"
+            f"    {canvas} create image 0 0 -anchor nw -image {button} -state hidden\n"
+            f"}}\n"
+            f"for {{set i {pool}}} {{$i < {self.item_count}}} {{incr i}} {{\n"
+            f"    {canvas} itemconfigure [expr {{{self.first_item} + $i}}] -state hidden\n"
+            f"}}"
+        )
+        self.item_count = max(self.item_count, pool)
+        self.slot_cell = array("l", [-1]) * pool
+        self.slot_code = bytearray([_NO_CODE]) * pool
+        self.view = (0, 0, 0, 0)
+        self.update_view()
+
+    def scrolled(self, scrollbar, first, last):
+        """Follow a scroll of the canvas: update the scrollbar and the cells in view."""
+        scrollbar.set(first, last)
+        if float(first) <= 0 and float(last) >= 1:
+            scrollbar.grid_remove()
+        else:
+            scrollbar.grid()
+        if not self.view_pending:
+            self.view_pending = True
+            self.canvas.after_idle(self.update_view)
+
+    def update_view(self):
+        """
+        Move the pool over the cells now in view. Only cells entering the covered
+        area are painted, each on the item just freed by a cell leaving it.
+        """
+        self.view_pending = False
+        board = self.board
+        size = self.cell_size
+        cols, rows = self.cols, self.rows
+        left = int(self.canvas.canvasx(0)) // size - MARGIN
+        top = int(self.canvas.canvasy(0)) // size - MARGIN
+        x0 = max(0, min(left, board.width - cols))
+        y0 = max(0, min(top, board.height - rows))
+        view = (x0, y0, x0 + cols, y0 + rows)
+        if view == self.view:
+            return
+        old_x0, old_y0, old_x1, old_y1 = self.view
+        self.view = view
+
+        state = board.state
+        mines_around = board.mines_around
+        inspected = self.grid.inspected
+        game_over = self.grid.game_over_drawn
+        names = self.sprites.names
+        slot_cell, slot_code = self.slot_cell, self.slot_code
+        canvas = str(self.canvas)
+        first_item = self.first_item
+        width = board.width
+        shift = self.shift
+
+        commands = []
+        for y in range(y0, y0 + rows):
+            if old_y0 <= y < old_y1:
+                xs = [x for x in range(x0, x0 + cols) if not old_x0 <= x < old_x1]
+            else:
+                xs = range(x0, x0 + cols)
+            row_slot = (y % rows) * cols
+            for x in xs:
+                index = y * width + x
+                slot = row_slot + x % cols
+                code = sprite_code(state[index], mines_around[index], index in inspected, game_over)
+                slot_cell[slot] = index
+                slot_code[slot] = code
+                item = first_item + slot
+                commands.append(
+                    f"{canvas} coords {item} {x * size + (y & 1) * shift} {y * size}\n"
+                    f"{canvas} itemconfigure {item} -image {names[code]} -state normal"
+                )
+        if commands:
+            self.reconfigured += len(commands)
+            self.canvas.tk.eval("\n".join(commands))
+
+    def wheel(self, event, axis, delta):
+        """Scroll or zoom the view by one mouse wheel step."""
+        step = -1 if delta > 0 else 1
+        if axis == "zoom":
+            self.zoom(-step, event.x, event.y)
+        elif axis == "x":
+            self.canvas.xview_scroll(step * SCROLL_STEP, "units")
+        else:
+            self.canvas.yview_scroll(step * SCROLL_STEP, "units")
+
+    def zoom(self, steps, x, y):
+        """
+        Change the cell size by a number of zoom levels, keeping the point under the
+        pointer in place. Every zoom level has its own pre-scaled sprite set.
+        :param steps: Zoom levels to move, positive to zoom in
+        :param x: X coordinate of the pointer in the canvas window
+        :param y: Y coordinate of the pointer in the canvas window
+        """
+        sizes = sorted(set(ZOOM_SIZES) | {self.cell_size})
+        level = max(0, min(len(sizes) - 1, sizes.index(self.cell_size) + steps))
+        size = sizes[level]
+        if size == self.cell_size:
+            return
+        # Board position under the pointer, in cells
+        cell_x = self.canvas.canvasx(x) / self.cell_size
+        cell_y = self.canvas.canvasy(y) / self.cell_size
+
+        self.cell_size = size
+        self.sprites = get_sprites(self.canvas, size)
+        if self.hint_shown:
+            self.hint_shown = False
+            self.canvas.itemconfigure(self.hint_item, state="hidden")
+        self.layout()
+        self.canvas.xview_moveto(max(0.0, (cell_x * size - x) / (self.board.width * size + self.shift)))
+        self.canvas.yview_moveto(max(0.0, (cell_y * size - y) / (self.board.height * size)))
+        self.update_view()
+
+    def dispatch(self, handler, event):
+        """Call a handler with the cell under the pointer, if any."""
+        cell = self.cell_at(event.x, event.y)
+        if cell is not None:
+            handler(cell, event)
+
+    def cell_at(self, x, y):
+        """
+        Find the cell under a point of the canvas window.
+        :param x: X coordinate in window pixels
+        :param y: Y coordinate in window pixels
+        :return: The Cell, or None outside the board
+        """
+        y = int(self.canvas.canvasy(y)) // self.cell_size
+        x = (int(self.canvas.canvasx(x)) - (y & 1) * self.shift) // self.cell_size
+        if 0 <= x < self.board.width and 0 <= y < self.board.height:
+            return self.grid.cell(x, y)
+        return None
+
+    def changed_cells(self):
+        """Return the indices of the drawn cells not showing the button sprite."""
+        return [self.slot_cell[slot] for slot in not_buttons(self.slot_code) if self.slot_cell[slot] >= 0]
+
+    def show_hint(self, x, y):
+        """Outline a cell until the next repaint, scrolling it into view if needed."""
+        size = self.cell_size
+        left, top = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        offset = (y & 1) * self.shift
+        if not (left <= x * size + offset and (x + 1) * size + offset <= left + self.view_width):
+            self.canvas.xview_moveto(
+                max(0.0, (x * size + offset - self.view_width / 2) / (self.board.width * size + self.shift))
+            )
+        if not (top <= y * size and (y + 1) * size <= top + self.view_height):
+            self.canvas.yview_moveto(max(0.0, (y * size - self.view_height / 2) / (self.board.height * size)))
+        self.canvas.coords(
+            self.hint_item, x * size + offset + 1, y * size + 1, (x + 1) * size + offset - 1, (y + 1) * size - 1
+        )
+        self.canvas.itemconfigure(self.hint_item, state="normal")
+        self.canvas.tag_raise(self.hint_item)
+        self.hint_shown = True
+
+    def refresh_shown(self):
+        """Mark every cell drawn by the pool for a repaint, e.g. when the game is lost."""
+        self.refresh([index for index in self.slot_cell if index >= 0])
+
+    def refresh(self, indices):
+        """Mark cells for a repaint on the next idle tick."""
+        if self.hint_shown:
+            self.hint_shown = False
+            self.canvas.itemconfigure(self.hint_item, state="hidden")
+        self.dirty.update(indices)
+        if self.dirty and not self.flush_pending:
+            self.flush_pending = True
+            self.canvas.after_idle(self.flush)
+
+    def flush(self):
+        """
+        Repaint every dirty cell in view whose sprite changed with a single Tcl call.
+        Cells out of view are painted when they are scrolled into view.
+        """
+        self.flush_pending = False
+        if not self.dirty:
+            return
+        board = self.board
+        state = board.state
+        mines_around = board.mines_around
+        inspected = self.grid.inspected
+        game_over = self.grid.game_over_drawn
+        slot_code = self.slot_code
+        names = self.sprites.names
+        canvas = str(self.canvas)
+        first_item = self.first_item
+        width = board.width
+        cols, rows = self.cols, self.rows
+        x0, y0, x1, y1 = self.view
+
+        commands = []
+        for index in self.dirty:
+            x, y = index % width, index // width
+            if not (x0 <= x < x1 and y0 <= y < y1):
+                continue
+            slot = (y % rows) * cols + x % cols
+            code = sprite_code(state[index], mines_around[index], index in inspected, game_over)
+            if slot_code[slot] != code:
+                slot_code[slot] = code
+                commands.append(f"{canvas} itemconfigure {first_item + slot} -image {names[code]}")
+        self.dirty.clear()
+        if commands:
+            self.reconfigured += len(commands)
+            self.canvas.tk.eval("\n".join(commands))
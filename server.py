@@ -0,0 +1,290 @@
+import argparse
+import asyncio
+import json
+import struct
+import time
+from board import MINED, FLAGGED
+from grid import Grid
+from protocol import (
+    NEW, REVEAL, FLAG, RESET, STARTED, DELTA, ERROR, NEW_GAME, CELL, PLAYING, WON, LOST, MAX_REQUEST,
+    encode_delta, frame, read_frame,
+)
+from spritecodes import not_buttons, sprite_code
+from topology import TOPOLOGIES
+
+try:
+    import resource
+except ImportError:  # Not available on Windows
+    resource = None
+
+# Seconds without a request after which a session is closed
+IDLE_TIMEOUT = 300.0
+MAX_SESSIONS = 10000
+# Largest board a session may play, in cells. Requests are handled inline, so
+# this bounds how long one request holds the event loop: the reveal that opens
+# a whole 256x256 board takes about 45 ms and keeps about 0.3 MB per session
+MAX_CELLS = 1 << 16
+# Reply bytes buffered for a client before its session stops reading requests
+WRITE_BUFFER = 1 << 16
+
+
+class DeltaRenderer:
+    def __init__(self, grid):
+        """
+        Stand in for CanvasRenderer in a server session. Instead of painting, keep
+        the sprite code the client was last sent for every cell, and turn the cells
+        the grid marks for a repaint into a delta of those whose code changed.
+        :param grid: Grid of the session
+        """
+        self.grid = grid
+        self.board = grid.board
+        self.shown = bytearray(self.board.size)
+        self.dirty = set()
+
+    def refresh(self, indices):
+        """Mark cells to be compared with what the client shows."""
+        self.dirty.update(indices)
+
+    def refresh_shown(self):
+        """Mark the cells whose sprite depends on the game being lost: mines and flags."""
+        self.dirty.update(index for index, cell in enumerate(self.board.state) if cell & (MINED | FLAGGED))
+
+    def changed_cells(self):
+        """Return the indices of the cells the client does not show as a button."""
+        return not_buttons(self.shown)
+
+    def show_hint(self, x, y):
+        """Hints are not part of the protocol."""
+
+    def flush(self):
+        """
+        Compute the sprite codes of the dirty cells and record them as sent.
+        :return: Tuple (sorted indices, codes) of the cells whose code changed
+        """
+        board = self.board
+        state = board.state
+        mines_around = board.mines_around
+        game_over = self.grid.game_over_drawn
+        shown = self.shown
+        indices = []
+        codes = bytearray()
+        for index in sorted(self.dirty):
+            code = sprite_code(state[index], mines_around[index], False, game_over)
+            if shown[index] != code:
+                shown[index] = code
+                indices.append(index)
+                codes.append(code)
+        self.dirty.clear()
+        return indices, codes
+
+
+class Session:
+    def __init__(self, server, reader, writer):
+        """
+        Initialize the game of one connection.
+        :param server: GameServer the connection belongs to
+        :param reader: asyncio.StreamReader of the connection
+        :param writer: asyncio.StreamWriter of the connection
+        """
+        self.server = server
+        self.reader = reader
+        self.writer = writer
+        self.last_active = time.monotonic()
+        self.task = asyncio.current_task()
+        self.grid = None
+        self.status = PLAYING
+
+    async def run(self):
+        """
+        Answer the requests one at a time until the client leaves or is evicted.
+        A reply is fully handed to the transport before the next request is read,
+        so a client that stops reading only stalls its own session.
+        """
+        writer = self.writer
+        server = self.server
+        try:
+            while True:
+                try:
+                    kind, payload = await read_frame(self.reader, MAX_REQUEST)
+                except ValueError as error:
+                    # The stream cannot be resynchronized after a bad frame
+                    writer.write(frame(ERROR, str(error).encode()))
+                    return
+                self.last_active = time.monotonic()
+                try:
+                    reply = self.handle(kind, payload)
+                except (ValueError, struct.error) as error:
+                    reply = frame(ERROR, str(error).encode())
+                server.requests += 1
+                server.bytes_sent += len(reply)
+                writer.write(reply)
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionError):
+            return
+
+    def handle(self, kind, payload):
+        """
+        Apply one request.
+        :return: Bytes of the reply frame
+        :raise ValueError: If the request is invalid
+        """
+        if kind == NEW:
+            return self.new_game(*NEW_GAME.unpack(payload))
+        if self.grid is None:
+            raise ValueError("No game started")
+        if kind == RESET:
+            self.grid.reset_all_cells()
+            self.status = PLAYING
+        elif kind == REVEAL or kind == FLAG:
+            x, y = CELL.unpack(payload)
+            board = self.grid.board
+            if x >= board.width or y >= board.height:
+                raise ValueError(f"Cell ({x}, {y}) is outside the board")
+            if self.status == PLAYING:
+                if kind == REVEAL:
+                    if self.grid.reveal_cell(x, y):
+                        self.status = LOST
+                else:
+                    self.grid.cell(x, y).toggle_flags()
+                if self.status == PLAYING and self.grid.mines_placed and self.grid.check_victory():
+                    self.status = WON
+        else:
+            raise ValueError(f"Unknown request {kind}")
+        return self.delta()
+
+    def new_game(self, width, height, mines_count, topology, seed):
+        """Start a game on a new board, replacing the current one."""
+        if not 0 < width * height <= MAX_CELLS:
+            raise ValueError(f"Boards hold 1 to {MAX_CELLS} cells")
+        if mines_count > width * height - 9:
+            raise ValueError(f"Too many mines for a {width}x{height} board")
+        if topology >= len(TOPOLOGIES):
+            raise ValueError(f"Unknown topology {topology}")
+        self.grid = Grid(0, width, height, mines_count, seed=seed if seed >= 0 else None,
+                         topology=TOPOLOGIES[topology])
+        self.grid.renderer = DeltaRenderer(self.grid)
+        self.status = PLAYING
+        return frame(STARTED, NEW_GAME.pack(width, height, mines_count, topology, seed))
+
+    def delta(self):
+        """Return the DELTA frame of the cells changed since the last reply."""
+        board = self.grid.board
+        indices, codes = self.grid.renderer.flush()
+        return frame(DELTA, encode_delta(self.status, board.mines_count - board.flags_count, indices, codes))
+
+
+class GameServer:
+    def __init__(self, idle_timeout=IDLE_TIMEOUT, max_sessions=MAX_SESSIONS):
+        """
+        Initialize a server hosting one game per connection in a single event loop.
+        :param idle_timeout: Seconds without a request after which a session is closed
+        :param max_sessions: Connections refused beyond this number of sessions
+        """
+        self.idle_timeout = idle_timeout
+        self.max_sessions = max_sessions
+        self.sessions = set()
+        self.server = None
+        self.reaper = None
+
+        # Totals since the server started
+        self.requests = 0
+        self.bytes_sent = 0
+        self.evicted = 0
+        self.refused = 0
+        self.peak_sessions = 0
+
+    async def start(self, host="127.0.0.1", port=0):
+        """
+        Start listening.
+        :param port: Port to listen on, 0 for any free port
+        :return: The port listened on
+        """
+        self.server = await asyncio.start_server(self.connect, host, port, backlog=1024)
+        self.reaper = asyncio.get_running_loop().create_task(self.evict_idle())
+        return self.server.sockets[0].getsockname()[1]
+
+    async def connect(self, reader, writer):
+        """Run the session of a new connection."""
+        if len(self.sessions) >= self.max_sessions:
+            self.refused += 1
+            writer.write(frame(ERROR, b"Too many sessions"))
+            writer.close()
+            return
+        writer.transport.set_write_buffer_limits(high=WRITE_BUFFER)
+        session = Session(self, reader, writer)
+        self.sessions.add(session)
+        self.peak_sessions = max(self.peak_sessions, len(self.sessions))
+        try:
+            await session.run()
+        finally:
+            self.sessions.discard(session)
+            writer.close()
+
+    async def evict_idle(self):
+        """Close the sessions idle for longer than the timeout, checking a few times per timeout."""
+        while True:
+            await asyncio.sleep(self.idle_timeout / 4)
+            deadline = time.monotonic() - self.idle_timeout
+            for session in [session for session in self.sessions if session.last_active < deadline]:
+                self.evicted += 1
+                # Aborting drops the replies a stalled client never read and ends its drain
+                session.writer.transport.abort()
+
+    def stats(self):
+        """Return the counters of the server."""
+        return {
+            "sessions": len(self.sessions),
+            "peak_sessions": self.peak_sessions,
+            "requests": self.requests,
+            "bytes_sent": self.bytes_sent,
+            "evicted": self.evicted,
+            "refused": self.refused,
+        }
+
+    async def close(self):
+        """Stop listening and close every session."""
+        self.reaper.cancel()
+        self.server.close()
+        sessions = list(self.sessions)
+        for session in sessions:
+            session.writer.transport.abort()
+        await asyncio.gather(*(session.task for session in sessions), return_exceptions=True)
+        await self.server.wait_closed()
+
+
+def raise_open_files_limit():
+    """Raise the soft limit of open files to the hard limit, one is needed per session."""
+    if resource is not None:
+        soft, hard = resource.getrlimit(resource.RLIMIT_NOFILE)
+        if soft != hard:
+            resource.setrlimit(resource.RLIMIT_NOFILE, (hard, hard))
+
+
+async def serve(host, port, idle_timeout, max_sessions, stats_interval):
+    """Run a server until interrupted, printing its counters periodically."""
+    server = GameServer(idle_timeout, max_sessions)
+    port = await server.start(host, port)
+    # Read by clients started on port 0, e.g. the load generator
+    print(f"listening on {host}:{port}", flush=True)
+    try:
+        while True:
+            await asyncio.sleep(stats_interval)
+            print(json.dumps(server.stats()), flush=True)
+    finally:
+        await server.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Minesweeper game server, one game per connection")
+    parser.add_argument("--host", default="127.0.0.1", help="address to listen on")
+    parser.add_argument("--port", type=int, default=8765, help="port to listen on, 0 for any free port")
+    parser.add_argument("--idle", type=float, default=IDLE_TIMEOUT, help="seconds before an idle session is closed")
+    parser.add_argument("--max-sessions", type=int, default=MAX_SESSIONS, help="sessions accepted at once")
+    parser.add_argument("--stats", type=float, default=10.0, help="seconds between two counter reports")
+    args = parser.parse_args()
+
+    raise_open_files_limit()
+    try:
+        asyncio.run(serve(args.host, args.port, args.idle, args.max_sessions, args.stats))
+    except KeyboardInterrupt:
+        pass
@@ -0,0 +1,116 @@
+import re
+
+# Cells per chunk. Snapshots share every chunk whose bytes did not change, so an
+# action costs about one chunk per layer it touched, plus a reference per chunk.
+CHUNK_SIZE = 4096
+
+_NONZERO_BYTE = re.compile(b"[^\x00]")
+
+
+def split(buffer, base=None):
+    """
+    Split a buffer into immutable chunks.
+    :param buffer: Bytearray to split
+    :param base: Chunks of an earlier split of a buffer of the same size, reused
+        where they hold the same bytes; compared in place with startswith, without copies
+    :return: Tuple of bytes chunks
+    """
+    starts = range(0, len(buffer), CHUNK_SIZE)
+    if base is None:
+        return tuple(bytes(buffer[start:start + CHUNK_SIZE]) for start in starts)
+    return tuple(
+        chunk if buffer.startswith(chunk, start) else bytes(buffer[start:start + CHUNK_SIZE])
+        for chunk, start in zip(base, starts)
+    )
+
+
+def merge(buffer, chunks):
+    """
+    Copy chunks back into a buffer, writing only those that differ.
+    :param buffer: Bytearray to update in place
+    :param chunks: Chunks from split on a buffer of the same size
+    :return: List of the indices whose byte changed
+    """
+    changed = []
+    for chunk, start in zip(chunks, range(0, len(buffer), CHUNK_SIZE)):
+        if not buffer.startswith(chunk, start):
+            end = start + len(chunk)
+            # The bytes that differ are the non-zero bytes of the XOR of both versions
+            difference = int.from_bytes(buffer[start:end], "little") ^ int.from_bytes(chunk, "little")
+            changed.extend(start + match.start()
+                           for match in _NONZERO_BYTE.finditer(difference.to_bytes(len(chunk), "little")))
+            buffer[start:end] = chunk
+    return changed
+
+
+class Snapshot:
+    __slots__ = ("layers", "counters")
+
+    def __init__(self, layers, counters):
+        """
+        Initialize a frozen copy of a board, see Board.snapshot.
+        :param layers: Tuple of chunk tuples, one per byte buffer of the board
+        :param counters: Tuple of the running counters of the board
+        """
+        self.layers = layers
+        self.counters = counters
+
+    def memory_bytes(self, base=None):
+        """
+        Return the bytes of chunk data this snapshot holds that base does not share.
+        :param base: Snapshot of the same board, None to count every chunk
+        """
+        if base is None:
+            return sum(len(chunk) for layer in self.layers for chunk in layer)
+        return sum(
+            len(chunk)
+            for layer, base_layer in zip(self.layers, base.layers)
+            for chunk, base_chunk in zip(layer, base_layer)
+            if chunk is not base_chunk
+        )
+
+
+class History:
+    def __init__(self, snapshot):
+        """
+        Initialize an unlimited undo and redo history.
+        :param snapshot: Snapshot of the state before the first action
+        """
+        # The current state is the last snapshot of the undo stack
+        self.undo_stack = [snapshot]
+        self.redo_stack = []
+
+    @property
+    def current(self):
+        return self.undo_stack[-1]
+
+    def push(self, snapshot):
+        """
+        Record the state after an action, forgetting the undone actions.
+        :return: False if the snapshot is the current one, i.e. nothing changed
+        """
+        if snapshot is self.current:
+            return False
+        self.undo_stack.append(snapshot)
+        self.redo_stack.clear()
+        return True
+
+    def undo(self):
+        """
+        Step back one action.
+        :return: The snapshot to restore, None if there is nothing to undo
+        """
+        if len(self.undo_stack) < 2:
+            return None
+        self.redo_stack.append(self.undo_stack.pop())
+        return self.current
+
+    def redo(self):
+        """
+        Step forward one undone action.
+        :return: The snapshot to restore, None if there is nothing to redo
+        """
+        if not self.redo_stack:
+            return None
+        self.undo_stack.append(self.redo_stack.pop())
+        return self.current
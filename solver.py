@@ -0,0 +1,386 @@
+import math
+from board import MINED, REVEALED, FLAGGED
+
+# Frontier components larger than this, or needing more search steps, are not enumerated
+MAX_COMPONENT = 40
+MAX_STEPS = 200000
+# Enumeration results kept per component shape
+CACHE_SIZE = 4096
+
+
+class Solver:
+    def __init__(self, board):
+        """
+        Initialize a constraint solver reading the revealed numbers of a board.
+        Flags are player input and are not trusted; only revealed cells are used.
+        :param board: Board to solve
+        """
+        self.board = board
+        # Enumeration results by component shape, shared across games
+        self.cache = {}
+        self.reset()
+
+    def reset(self):
+        """Forget everything deduced about the board, e.g. after a reset."""
+        # Unrevealed cells proven safe or mined
+        self.safe = set()
+        self.mines = set()
+        # Revealed cell index -> (unknown neighbours, mines left among them)
+        self.constraints = {}
+        # Unknown cell -> revealed cells constraining it
+        self.watchers = {}
+        # Unknown cell -> its frontier component, and component -> enumeration result
+        self.component_of = {}
+        self.components = {}
+
+    def rebuild(self):
+        """Solve the board from scratch, using every revealed cell."""
+        self.reset()
+        state = self.board.state
+        self.update(index for index in range(self.board.size) if state[index] & REVEALED)
+
+    def update(self, revealed):
+        """
+        Take newly revealed cells into account, re-solving only the frontier
+        components they touch.
+        :param revealed: Indices of the cells revealed since the last update
+        """
+        board = self.board
+        state = board.state
+        touched = set()
+        for index in revealed:
+            self.safe.discard(index)
+            self.mines.discard(index)
+            for neighbor in board.topology.neighbors(index):
+                if state[neighbor] & REVEALED:
+                    touched.add(neighbor)
+        self._propagate(touched)
+
+    def _constraint(self, index):
+        """Build the constraint of a revealed cell, None if it has no unknown neighbour."""
+        board = self.board
+        state = board.state
+        if not state[index] & REVEALED or state[index] & MINED:
+            return None
+        cells = []
+        count = board.mines_around[index]
+        for neighbor in board.topology.neighbors(index):
+            if neighbor in self.mines or state[neighbor] & (REVEALED | MINED) == REVEALED | MINED:
+                count -= 1
+            elif not state[neighbor] & REVEALED and neighbor not in self.safe:
+                cells.append(neighbor)
+        if not cells:
+            return None
+        return frozenset(cells), count
+
+    def _set_constraint(self, index, constraint):
+        """Replace the constraint of a revealed cell and keep the watchers in sync."""
+        old = self.constraints.pop(index, None)
+        if old is not None:
+            for cell in old[0]:
+                watchers = self.watchers[cell]
+                watchers.discard(index)
+                if not watchers:
+                    del self.watchers[cell]
+        if constraint is not None:
+            self.constraints[index] = constraint
+            for cell in constraint[0]:
+                self.watchers.setdefault(cell, set()).add(index)
+
+    def _prove(self, cells, mined):
+        """
+        Record cells as proven mines or safe cells.
+        :return: Revealed cells whose constraints must be rebuilt
+        """
+        proven = self.mines if mined else self.safe
+        state = self.board.state
+        touched = set()
+        for cell in cells:
+            # Constraints waiting for a rebuild may still list revealed cells
+            if state[cell] & REVEALED:
+                continue
+            if cell not in self.safe and cell not in self.mines:
+                proven.add(cell)
+                touched |= self.watchers.get(cell, set())
+        return touched
+
+    def _propagate(self, touched):
+        """
+        Rebuild the touched constraints, apply the single-cell and subset rules until
+        nothing changes, then enumerate the frontier components that changed.
+        """
+        regroup = set()
+        while touched:
+            pending = list(touched)
+            touched = set()
+            while pending:
+                index = pending.pop()
+                old = self.constraints.get(index)
+                new = self._constraint(index)
+                if old == new:
+                    continue
+                if old is not None:
+                    regroup |= old[0]
+                self._set_constraint(index, new)
+                if new is None:
+                    continue
+                regroup |= new[0]
+                pending.extend(self._local_rules(index, new))
+            touched = self._solve_components(regroup)
+            regroup = set()
+
+    def _local_rules(self, index, constraint):
+        """
+        Apply the single-cell rule to a constraint and the subset rule against the
+        constraints it overlaps.
+        :return: Revealed cells whose constraints must be rebuilt
+        """
+        cells, count = constraint
+        if count == 0:
+            return self._prove(cells, False)
+        if count == len(cells):
+            return self._prove(cells, True)
+
+        touched = set()
+        others = set()
+        for cell in cells:
+            others |= self.watchers[cell]
+        others.discard(index)
+        for other in others:
+            other_cells, other_count = self.constraints[other]
+            for small, small_count, large, large_count in (
+                (cells, count, other_cells, other_count),
+                (other_cells, other_count, cells, count),
+            ):
+                if small < large:
+                    rest = large - small
+                    if large_count - small_count == 0:
+                        touched |= self._prove(rest, False)
+                    elif large_count - small_count == len(rest):
+                        touched |= self._prove(rest, True)
+        return touched
+
+    def _solve_components(self, regroup):
+        """
+        Rebuild the frontier components containing the given cells and enumerate them.
+        :return: Revealed cells whose constraints must be rebuilt after new proofs
+        """
+        seeds = set()
+        for cell in regroup:
+            key = self.component_of.get(cell)
+            if key is not None:
+                self._drop_component(key)
+            if cell in self.watchers:
+                seeds.add(cell)
+
+        touched = set()
+        visited = set()
+        for seed in seeds:
+            if seed in visited:
+                continue
+            # Gather the connected component of the seed through shared constraints
+            cells = []
+            constraint_ids = set()
+            stack = [seed]
+            visited.add(seed)
+            while stack:
+                cell = stack.pop()
+                cells.append(cell)
+                key = self.component_of.get(cell)
+                if key is not None:
+                    self._drop_component(key)
+                for index in self.watchers[cell]:
+                    if index not in constraint_ids:
+                        constraint_ids.add(index)
+                        for other in self.constraints[index][0]:
+                            if other not in visited:
+                                visited.add(other)
+                                stack.append(other)
+
+            cells.sort()
+            key = frozenset(cells)
+            result = self._enumerate(cells, [self.constraints[index] for index in constraint_ids])
+            self.components[key] = (cells, result)
+            for cell in cells:
+                self.component_of[cell] = key
+
+            if result is not None:
+                total = sum(solutions for solutions, _ in result.values())
+                per_cell = [sum(counts[i] for _, counts in result.values()) for i in range(len(cells))]
+                touched |= self._prove([cell for cell, n in zip(cells, per_cell) if n == 0], False)
+                touched |= self._prove([cell for cell, n in zip(cells, per_cell) if n == total], True)
+        return touched
+
+    def _drop_component(self, key):
+        """Forget a frontier component whose constraints changed."""
+        self.components.pop(key, None)
+        for cell in key:
+            if self.component_of.get(cell) == key:
+                del self.component_of[cell]
+
+    def _enumerate(self, cells, constraints):
+        """
+        Count the mine layouts of a frontier component by backtracking.
+        Results are cached by the shape of the component, with cells renamed to
+        their rank, so identical local situations are only enumerated once.
+        :param cells: Sorted unknown cells of the component
+        :param constraints: List of (cells, mines left) constraints over them
+        :return: Dict mine count -> (solutions, mine count of each cell), or None if too large
+        """
+        if len(cells) > MAX_COMPONENT:
+            return None
+        rank = {cell: i for i, cell in enumerate(cells)}
+        shape = tuple(sorted((tuple(sorted(rank[cell] for cell in group)), count) for group, count in constraints))
+        key = (len(cells), shape)
+        if key in self.cache:
+            return self.cache[key]
+
+        size = len(cells)
+        needed = [count for _, count in shape]
+        free = [len(group) for group, _ in shape]
+        of_cell = [[] for _ in range(size)]
+        for number, (group, _) in enumerate(shape):
+            for cell in group:
+                of_cell[cell].append(number)
+
+        result = {}
+        assignment = [0] * size
+        steps = [0]
+
+        def search(position, mines):
+            steps[0] += 1
+            if steps[0] > MAX_STEPS:
+                raise OverflowError
+            if position == size:
+                solutions, counts = result.get(mines, (0, [0] * size))
+                result[mines] = (solutions + 1, [c + a for c, a in zip(counts, assignment)])
+                return
+            for value in (0, 1):
+                valid = True
+                for number in of_cell[position]:
+                    free[number] -= 1
+                    needed[number] -= value
+                    if needed[number] < 0 or needed[number] > free[number]:
+                        valid = False
+                if valid:
+                    assignment[position] = value
+                    search(position + 1, mines + value)
+                for number in of_cell[position]:
+                    free[number] += 1
+                    needed[number] += value
+            assignment[position] = 0
+
+        try:
+            search(0, 0)
+        except OverflowError:
+            result = None
+
+        if len(self.cache) >= CACHE_SIZE:
+            self.cache.clear()
+        self.cache[key] = result
+        return result
+
+    def probabilities(self):
+        """
+        Compute the probability of holding a mine for every unrevealed cell.
+        Frontier components are combined exactly, weighting each total of frontier
+        mines by the ways to place the remaining mines among the other cells.
+        Components too large to enumerate are approximated by their local densities.
+        :return: Dict index -> probability, for every unrevealed cell
+        """
+        board = self.board
+        state = board.state
+        unknown = [index for index in range(board.size) if not state[index] & REVEALED]
+        probabilities = {cell: 1.0 for cell in self.mines}
+        probabilities.update((cell, 0.0) for cell in self.safe)
+
+        enumerated = [(cells, result) for cells, result in self.components.values() if result is not None]
+        frontier = {cell for cells, _ in enumerated for cell in cells}
+        for cells, result in self.components.values():
+            if result is None:
+                for cell in cells:
+                    probabilities[cell] = max(
+                        count / len(group) for group, count in (self.constraints[i] for i in self.watchers[cell])
+                    )
+        interior = [cell for cell in unknown if cell not in frontier and cell not in probabilities]
+        mines_left = board.mines_count - len(self.mines) - sum(
+            1 for cell in range(board.size) if state[cell] & (REVEALED | MINED) == REVEALED | MINED
+        )
+
+        # Distribution of the number of frontier mines, without and with each component
+        distributions = [{k: solutions for k, (solutions, _) in result.items()} for _, result in enumerated]
+        prefix = [{0: 1}]
+        for distribution in distributions:
+            prefix.append(_convolve(prefix[-1], distribution))
+        suffix = [{0: 1}]
+        for distribution in reversed(distributions):
+            suffix.append(_convolve(suffix[-1], distribution))
+        suffix.reverse()
+
+        def weight(frontier_mines):
+            rest = mines_left - frontier_mines
+            if rest < 0 or rest > len(interior):
+                return 0.0
+            return math.exp(_log_comb(len(interior), rest) - base)
+
+        # Scale the weights by the largest one to keep them in floating-point range
+        base = max(
+            (_log_comb(len(interior), mines_left - k) for k in prefix[-1] if 0 <= mines_left - k <= len(interior)),
+            default=0.0,
+        )
+        total = sum(count * weight(k) for k, count in prefix[-1].items())
+        if total == 0:
+            return probabilities
+
+        for number, (cells, result) in enumerate(enumerated):
+            others = _convolve(prefix[number], suffix[number + 1])
+            mined = [0.0] * len(cells)
+            for k, (_, counts) in result.items():
+                factor = sum(count * weight(k + j) for j, count in others.items())
+                for i, count in enumerate(counts):
+                    mined[i] += count * factor
+            for cell, value in zip(cells, mined):
+                probabilities[cell] = value / total
+
+        if interior:
+            expected = sum(count * weight(k) * (mines_left - k) for k, count in prefix[-1].items()) / total
+            for cell in interior:
+                probabilities[cell] = expected / len(interior)
+        return probabilities
+
+    def hint(self):
+        """
+        Suggest the next cell to reveal: a proven safe cell if there is one, the
+        least likely mine otherwise. Flagged cells are never suggested.
+        :return: Tuple (x, y, mine probability), or None before the first click
+        """
+        board = self.board
+        state = board.state
+        if not board.mines_placed:
+            return None
+        for cell in sorted(self.safe):
+            if not state[cell] & (REVEALED | FLAGGED):
+                return (*board.coords(cell), 0.0)
+
+        candidates = [
+            (probability, cell) for cell, probability in self.probabilities().items()
+            if not state[cell] & FLAGGED and cell not in self.mines
+        ]
+        if not candidates:
+            return None
+        probability, cell = min(candidates)
+        return (*board.coords(cell), probability)
+
+
+def _convolve(first, second):
+    """Convolve two distributions of mine counts."""
+    result = {}
+    for i, a in first.items():
+        for j, b in second.items():
+            result[i + j] = result.get(i + j, 0) + a * b
+    return result
+
+
+def _log_comb(n, k):
+    """Logarithm of the binomial coefficient C(n, k)."""
+    return math.lgamma(n + 1) - math.lgamma(k + 1) - math.lgamma(n - k + 1)
@@ -0,0 +1,57 @@
+import re
+from board import MINED, REVEALED, FLAGGED, QUESTIONED
+
+# Sprite codes, indices into Sprites.images (codes 1 to 8 are the numbers).
+# They describe what a cell shows, so they are also what clients of the server receive.
+BUTTON = 0
+NEUTRAL = 9
+FLAG = 10
+QUESTION_MARK = 11
+EXPLODED_MINE = 12
+MINE = 13
+WRONG_MINE = 14
+
+_NOT_BUTTON = re.compile(b"[^%c]" % BUTTON)
+
+
+def sprite_code(cell, mines_around, inspected, game_over):
+    """
+    Choose the sprite of a cell.
+    :param cell: State bits of the cell
+    :param mines_around: Number of mines around the cell
+    :param inspected: True if the cell is under a held left click
+    :param game_over: True once the game over board is shown
+    :return: Sprite code, index into Sprites.images
+    """
+    if game_over:
+        if cell & MINED:
+            if cell & FLAGGED:
+                return FLAG
+            if cell & REVEALED:
+                return EXPLODED_MINE
+            return MINE
+        if cell & FLAGGED:
+            return WRONG_MINE
+
+    if cell & REVEALED:
+        if cell & MINED:
+            return EXPLODED_MINE
+        if mines_around > 0:
+            return mines_around
+        return NEUTRAL
+    if cell & FLAGGED:
+        return FLAG
+    if cell & QUESTIONED:
+        return QUESTION_MARK
+    if inspected:
+        return NEUTRAL
+    return BUTTON
+
+
+def not_buttons(codes):
+    """
+    Find the cells that do not show the button sprite.
+    :param codes: Bytes of sprite codes
+    :return: Positions in codes of the codes other than BUTTON
+    """
+    return [match.start() for match in _NOT_BUTTON.finditer(codes)]
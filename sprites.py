@@ -0,0 +1,163 @@
+import base64
+import os
+import struct
+import time
+import tkinter as tk
+from spritecodes import BUTTON, NEUTRAL, FLAG, QUESTION_MARK, EXPLODED_MINE, MINE, WRONG_MINE  # noqa: F401
+
+# Resolved from the module, so the game starts from any working directory
+IMAGES_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "images")
+# Every sprite pre-scaled to every zoom level, written by `python sprites.py`
+BUNDLE_PATH = os.path.join(IMAGES_DIR, "sprites.bundle")
+
+# Source image of every sprite code
+SPRITE_FILES = {
+    BUTTON: "button.png",
+    **{i: f"{i}.png" for i in range(1, 9)},
+    NEUTRAL: "neutral.png",
+    FLAG: "flag.png",
+    QUESTION_MARK: "QM.png",
+    EXPLODED_MINE: "exploded-mine.png",
+    MINE: "mine.png",
+    WRONG_MINE: "wrong-mine.png",
+}
+
+# Bundle header: magic, version and number of entries
+BUNDLE_HEADER = struct.Struct("<4sBH")
+BUNDLE_MAGIC = b"MSPR"
+BUNDLE_VERSION = 1
+# Entry header: cell size, sprite code and data length, followed by the
+# base64 PNG data, which Tk decodes without PIL
+BUNDLE_ENTRY = struct.Struct("<HBI")
+
+# Sprite sets by Tk interpreter and cell size, so every zoom level is scaled only once
+_cache = {}
+# Contents of the bundle once read: (size, code) -> base64 PNG data, empty without a bundle
+_bundle = None
+
+
+def read_bundle(path=BUNDLE_PATH):
+    """
+    Read a sprite bundle.
+    :param path: Path of the bundle
+    :return: Dict (cell size, sprite code) -> base64 PNG data
+    :raise ValueError: If the file is not a sprite bundle
+    """
+    with open(path, "rb") as file:
+        data = file.read()
+    magic, version, count = BUNDLE_HEADER.unpack_from(data)
+    if magic != BUNDLE_MAGIC or version != BUNDLE_VERSION:
+        raise ValueError(f"{path} is not a version {BUNDLE_VERSION} sprite bundle")
+    entries = {}
+    offset = BUNDLE_HEADER.size
+    for _ in range(count):
+        size, code, length = BUNDLE_ENTRY.unpack_from(data, offset)
+        offset += BUNDLE_ENTRY.size
+        entries[size, code] = data[offset:offset + length]
+        offset += length
+    return entries
+
+
+def bundled(size):
+    """Return the bundled data of every sprite at a cell size, None if the bundle lacks that size."""
+    global _bundle
+    if _bundle is None:
+        try:
+            _bundle = read_bundle()
+        except (OSError, ValueError, struct.error):
+            _bundle = {}
+    if all((size, code) in _bundle for code in SPRITE_FILES):
+        return [_bundle[size, code] for code in sorted(SPRITE_FILES)]
+    return None
+
+
+def scaled_png(code, size):
+    """
+    Decode the source image of a sprite and scale it to a cell size. Needs PIL.
+    :return: Bytes of the scaled image as a PNG
+    """
+    from io import BytesIO
+    from PIL import Image
+
+    image = Image.open(os.path.join(IMAGES_DIR, SPRITE_FILES[code]))
+    if image.size != (size, size):
+        image = image.resize((size, size), Image.LANCZOS)
+    output = BytesIO()
+    image.save(output, "PNG", optimize=True)
+    return output.getvalue()
+
+
+def write_bundle(sizes, path=BUNDLE_PATH):
+    """
+    Scale every sprite to every cell size and write them to one bundle. Needs PIL.
+    :param sizes: Cell sizes to include
+    :param path: Path of the bundle
+    """
+    entries = []
+    for size in sizes:
+        for code in sorted(SPRITE_FILES):
+            data = base64.b64encode(scaled_png(code, size))
+            entries.append(BUNDLE_ENTRY.pack(size, code, len(data)) + data)
+    with open(path, "wb") as file:
+        file.write(BUNDLE_HEADER.pack(BUNDLE_MAGIC, BUNDLE_VERSION, len(entries)))
+        file.write(b"".join(entries))
+
+
+class Sprites:
+    def __init__(self, master, size):
+        """
+        Load every cell image once and keep the Tk photo objects alive. Sizes found
+        in the bundle are handed to Tk as they are; PIL is only imported to scale
+        the source images to any other size.
+        :param master: Any widget of the Tk interpreter the images belong to
+        :param size: Size of the cells the images are scaled to
+        """
+        self.size = size
+        start = time.perf_counter()
+
+        data = bundled(size)
+        self.from_bundle = data is not None
+        if data is None:
+            data = [base64.b64encode(scaled_png(code, size)) for code in sorted(SPRITE_FILES)]
+        # Images by sprite code, and their Tk names for batched Tcl commands
+        self.images = [tk.PhotoImage(master=master, data=item.decode("ascii"), format="png") for item in data]
+        self.names = [str(image) for image in self.images]
+
+        self.load_time = time.perf_counter() - start
+
+    def stats(self):
+        """Return the load time and memory use of the sprite set."""
+        return {
+            "size": self.size,
+            "images": len(self.images),
+            "from_bundle": self.from_bundle,
+            "load_time": self.load_time,
+            # Tk stores photos as 32-bit pixels
+            "memory_bytes": len(self.images) * self.size * self.size * 4,
+        }
+
+
+def get_sprites(master, size):
+    """
+    Return the shared sprite set of the interpreter for a cell size, building it on first use.
+    :param master: Any widget of the Tk interpreter
+    :param size: Size of the cells
+    :return: The Sprites instance for this interpreter and size
+    """
+    sets = _cache.setdefault(master.tk, {})
+    sprites = sets.get(size)
+    if sprites is None:
+        sprites = sets[size] = Sprites(master, size)
+    return sprites
+
+
+def clear_sprites(master):
+    """Forget the sprite sets of an interpreter, e.g. before destroying its root."""
+    _cache.pop(master.tk, None)
+
+
+if __name__ == "__main__":
+    from renderer import ZOOM_SIZES
+
+    write_bundle(ZOOM_SIZES)
+    print(f"wrote {BUNDLE_PATH}: {len(ZOOM_SIZES)} sizes, {os.path.getsize(BUNDLE_PATH)} bytes")
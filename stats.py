@@ -0,0 +1,210 @@
+import os
+import queue
+import sqlite3
+import threading
+import time
+from board import count_3bv
+
+# Results written per transaction at most
+BATCH_SIZE = 512
+# Default location of the store
+DEFAULT_PATH = os.path.join(os.path.expanduser("~"), ".minesweeper-stats.sqlite")
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS games (
+    id INTEGER PRIMARY KEY,
+    finished_at REAL NOT NULL,
+    topology TEXT NOT NULL,
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    mines INTEGER NOT NULL,
+    seed INTEGER,
+    no_guess INTEGER NOT NULL,
+    won INTEGER NOT NULL,
+    duration_ms INTEGER,
+    bbbv INTEGER NOT NULL,
+    clicks INTEGER NOT NULL,
+    -- 1 if an undo was used, such games never hold a best time
+    assisted INTEGER NOT NULL DEFAULT 0
+);
+-- Running totals per preset, updated with every game, so win rates never scan the games
+CREATE TABLE IF NOT EXISTS presets (
+    width INTEGER NOT NULL,
+    height INTEGER NOT NULL,
+    mines INTEGER NOT NULL,
+    topology TEXT NOT NULL,
+    games INTEGER NOT NULL,
+    wins INTEGER NOT NULL,
+    best_ms INTEGER,
+    PRIMARY KEY (width, height, mines, topology)
+) WITHOUT ROWID;
+"""
+# Best times of a preset are an index range scan, in order
+_INDEX = "CREATE INDEX IF NOT EXISTS games_by_time ON games (width, height, mines, topology, won, assisted, duration_ms)"
+
+_INSERT_GAME = "INSERT INTO games VALUES (NULL, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+_UPDATE_PRESET = """
+INSERT INTO presets VALUES (?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (width, height, mines, topology) DO UPDATE SET
+    games = games + excluded.games,
+    wins = wins + excluded.wins,
+    best_ms = CASE
+        WHEN excluded.best_ms IS NOT NULL AND (best_ms IS NULL OR excluded.best_ms < best_ms) THEN excluded.best_ms
+        ELSE best_ms
+    END
+"""
+
+
+class StatsStore:
+    def __init__(self, path=DEFAULT_PATH):
+        """
+        Initialize a store of finished games, in a SQLite file in WAL mode.
+        Results are queued and written in batches by a background thread, so a
+        finished game never waits for the disk; the 3BV of a game is also computed
+        there. Totals per preset are kept in memory once read, so the topbar sees a
+        new best time at once. Wins where an undo was used count as games, but not
+        as wins or best times.
+        :param path: Path of the database file, created if needed
+        """
+        self.path = path
+        # Reads happen on the thread that created the store, writes on the writer thread
+        self.connection = self._connect()
+        self.connection.executescript(_SCHEMA)
+        self._migrate()
+        self.connection.execute(_INDEX)
+        # (width, height, mines, topology) -> [games, wins, best_ms]
+        self.summaries = {}
+
+        self.queue = queue.Queue()
+        self.thread = threading.Thread(target=self._write, daemon=True)
+        self.thread.start()
+
+    def _connect(self):
+        connection = sqlite3.connect(self.path)
+        connection.execute("PRAGMA journal_mode=WAL")
+        # Losing the last games on a power cut is acceptable, an fsync per batch is not needed
+        connection.execute("PRAGMA synchronous=NORMAL")
+        return connection
+
+    def _migrate(self):
+        """Add the assisted column to a store written before undo existed, and rebuild its index."""
+        columns = [row[1] for row in self.connection.execute("PRAGMA table_info(games)")]
+        if "assisted" not in columns:
+            with self.connection:
+                self.connection.execute("ALTER TABLE games ADD COLUMN assisted INTEGER NOT NULL DEFAULT 0")
+                self.connection.execute("DROP INDEX IF EXISTS games_by_time")
+
+    def record(self, board, won, duration_ms, clicks, no_guess=False, assisted=False):
+        """
+        Queue the result of a finished game. The board is copied, so it can be reset at once.
+        :param board: Board of the game, with its mines placed
+        :param won: True for a victory
+        :param duration_ms: Duration of the game in milliseconds
+        :param clicks: Actions of the player
+        :param no_guess: True if the board came from the no-guess generator
+        :param assisted: True if an undo was used during the game
+        """
+        snapshot = (board.topology, board.mine_map(), bytes(board.mines_around))
+        self.add(board.topology.kind, board.width, board.height, board.mines_count, board.seed, no_guess, won,
+                 duration_ms, None, clicks, assisted, snapshot)
+
+    def add(self, topology, width, height, mines_count, seed, no_guess, won, duration_ms, bbbv, clicks,
+            assisted=False, snapshot=None):
+        """
+        Queue a result given field by field, e.g. to import games.
+        :param bbbv: 3BV of the board, None to compute it from the snapshot
+        :param snapshot: Tuple (topology, mine map, mines around) of the board, if bbbv is None
+        """
+        key = (width, height, mines_count, topology)
+        summary = self._summary(key)
+        summary[0] += 1
+        if won and not assisted:
+            summary[1] += 1
+            if summary[2] is None or duration_ms < summary[2]:
+                summary[2] = duration_ms
+        row = (time.time(), topology, width, height, mines_count, seed, int(no_guess), int(won), duration_ms, bbbv,
+               clicks, int(assisted))
+        self.queue.put((row, snapshot))
+
+    def _write(self):
+        """Writer thread: commit the queued results in batches until a None is queued."""
+        connection = self._connect()
+        # Keep the pages of the index being appended to in memory as the table grows
+        connection.execute("PRAGMA cache_size=-32768")
+        running = True
+        while running:
+            batch = [self.queue.get()]
+            while len(batch) < BATCH_SIZE:
+                try:
+                    batch.append(self.queue.get_nowait())
+                except queue.Empty:
+                    break
+            games = []
+            # Totals of the batch per preset, so each preset is updated once per batch
+            presets = {}
+            for item in batch:
+                if item is None:
+                    running = False
+                    continue
+                row, snapshot = item
+                if row[9] is None:
+                    row = row[:9] + (count_3bv(*snapshot),) + row[10:]
+                games.append(row)
+                _, topology, width, height, mines_count, _, _, won, duration_ms, _, _, assisted = row
+                preset = presets.setdefault((width, height, mines_count, topology), [0, 0, None])
+                preset[0] += 1
+                if won and not assisted:
+                    preset[1] += 1
+                    if preset[2] is None or duration_ms < preset[2]:
+                        preset[2] = duration_ms
+            if games:
+                with connection:
+                    connection.executemany(_INSERT_GAME, games)
+                    connection.executemany(_UPDATE_PRESET, [key + tuple(totals) for key, totals in presets.items()])
+            for _ in batch:
+                self.queue.task_done()
+        connection.close()
+
+    def _summary(self, key):
+        """Return the cached totals of a preset, reading them on first use."""
+        summary = self.summaries.get(key)
+        if summary is None:
+            row = self.connection.execute(
+                "SELECT games, wins, best_ms FROM presets WHERE width = ? AND height = ? AND mines = ? AND topology = ?",
+                key,
+            ).fetchone()
+            summary = self.summaries[key] = list(row) if row else [0, 0, None]
+        return summary
+
+    def summary(self, width, height, mines_count, topology):
+        """
+        Return the totals of a preset, including the games still queued. Wins where
+        an undo was used are only counted as games.
+        :return: Dict with games, wins, win_rate and best_ms (None before the first win)
+        """
+        games, wins, best_ms = self._summary((width, height, mines_count, topology))
+        return {"games": games, "wins": wins, "win_rate": wins / games if games else 0.0, "best_ms": best_ms}
+
+    def best_times(self, width, height, mines_count, topology, limit=10):
+        """
+        Return the fastest wins without undo of a preset, read through the games_by_time
+        index. Games still queued are not included, see flush.
+        :return: List of (duration_ms, 3BV, clicks, seed, finished_at), fastest first
+        """
+        return self.connection.execute(
+            "SELECT duration_ms, bbbv, clicks, seed, finished_at FROM games"
+            " WHERE width = ? AND height = ? AND mines = ? AND topology = ? AND won = 1 AND assisted = 0"
+            " ORDER BY duration_ms LIMIT ?",
+            (width, height, mines_count, topology, limit),
+        ).fetchall()
+
+    def flush(self):
+        """Wait until every queued result is written."""
+        self.queue.join()
+
+    def close(self):
+        """Write the queued results and stop the writer thread. Closing twice does nothing."""
+        if self.thread.is_alive():
+            self.queue.put(None)
+            self.thread.join()
+            self.connection.close()
@@ -1,5 +1,20 @@
 import tkinter as tk
 from tkinter import Menu
+from clock import Clock
+from topology import SQUARE, TORUS, HEX
+
+# Difficulty presets of the menu: label, width, height and mines
+PRESETS = [
+    ("Easy 9x9 10 mines", 9, 9, 10),
+    ("Medium 16x16 40 mines", 16, 16, 40),
+    ("Hard 30x16 99 mines", 30, 16, 99),
+]
+# Board topologies of the menu: label and topology
+TOPOLOGY_CHOICES = [
+    ("Square", SQUARE),
+    ("Torus", TORUS),
+    ("Hexagonal", HEX),
+]
 
 
 # TopBar class that contains the timer and flag counter
@@ -7,7 +22,9 @@ class TopBar(tk.Frame):
     def __init__(self, parent, game, width):
         super().__init__(parent, width=width)
         self.game = game
-        self.timer_value = 0
+        # Monotonic game clock and the handle of its single scheduled tick
+        self.clock = Clock()
+        self.tick_id = None
         self.max_flag = self.game.mines_count
 
         # Timer display
@@ -20,12 +37,18 @@ class TopBar(tk.Frame):
 
         # Context menu (right-click)
         self.menu = Menu(self, tearoff=0)
-        self.menu.add_command(label="Easy 9x9 10 mines",
-                              command=lambda: self.game.change_mode(9, 9, 10))
-        self.menu.add_command(label="Medium 16x16 40 mines",
-                              command=lambda: self.game.change_mode(16, 16, 40))
-        self.menu.add_command(label="Hard 30x16 99 mines",
-                              command=lambda: self.game.change_mode(30, 16, 99))
+        for label, width, height, mines_count in PRESETS:
+            self.menu.add_command(label=label,
+                                  command=lambda w=width, h=height, m=mines_count: self.game.change_mode(w, h, m))
+        self.menu.add_separator()
+        self.no_guess = tk.BooleanVar(self, value=False)
+        self.menu.add_checkbutton(label="No guess", variable=self.no_guess,
+                                  command=lambda: self.game.set_no_guess(self.no_guess.get()))
+        self.menu.add_separator()
+        self.topology = tk.StringVar(self, value=self.game.topology)
+        for label, topology in TOPOLOGY_CHOICES:
+            self.menu.add_radiobutton(label=label, variable=self.topology, value=topology,
+                                      command=lambda: self.game.set_topology(self.topology.get()))
 
         # Bind right-click to the button to show the menu
         self.start_button.bind("<Button-3>", self.show_menu)
@@ -34,38 +57,85 @@ class TopBar(tk.Frame):
         self.flags_label = tk.Label(self, text=f"Flags: {self.max_flag}", font=("Arial", 14))
         self.flags_label.grid(row=0, column=2)
 
+        # Personal best of the current board, when keeping statistics
+        self.best_label = tk.Label(self, font=("Arial", 14))
+        self.best_label.grid(row=0, column=3)
+        self.update_best()
+
     def start_timer(self):
         """Start the timer."""
         if not self.game.running:
             self.game.running = True
-            self.update_timer()
+            self.clock.start()
+            self.tick()
+
+    def stop_timer(self):
+        """Stop the timer, e.g. on game over or victory, and record the final time."""
+        self.game.running = False
+        self.clock.stop()
+        self.cancel_tick()
+        self.game.duration_ms = self.clock.elapsed_ms()
+        self.update_timer()
 
     def reset_timer(self):
         """Reset the timer."""
         self.game.running = False
-        self.timer_value = 0
+        self.clock.reset()
+        self.cancel_tick()
         self.update_timer()
 
-    def update_timer(self):
-        """Update the timer."""
+    def tick(self):
+        """Refresh the timer, then schedule a single tick for the next whole second."""
+        self.tick_id = None
+        self.update_timer()
         if self.game.running:
-            self.timer_value += 1
-            self.timer_label.config(text=f"Timer: {self.timer_value}")
-            self.after(1000, self.update_timer)  # Update every second
+            self.tick_id = self.after(1000 - self.clock.elapsed_ms() % 1000, self.tick)
+
+    def cancel_tick(self):
+        """Cancel the scheduled tick, if any."""
+        if self.tick_id is not None:
+            self.after_cancel(self.tick_id)
+            self.tick_id = None
+
+    def update_timer(self):
+        """Update the timer display, with milliseconds once the clock is stopped."""
+        elapsed = self.clock.elapsed_ms()
+        if self.clock.running or not elapsed:
+            self.timer_label.config(text=f"Timer: {elapsed // 1000}")
         else:
-            self.timer_label.config(text=f"Timer: {self.timer_value}")
+            self.timer_label.config(text=f"Timer: {elapsed / 1000:.3f}")
 
     def update_flags(self):
         """Update the remaining flags counter."""
         remaining_flags = self.max_flag - self.game.flags_count
         self.flags_label.configure(text=remaining_flags)
 
+    def update_best(self):
+        """Update the best time and win rate of the current board size and topology."""
+        stats = self.game.stats
+        if stats is None:
+            self.best_label.configure(text="")
+            return
+        summary = stats.summary(self.game.row_cell_num, self.game.column_cell_num, self.game.mines_count,
+                                self.game.topology)
+        best = "-" if summary["best_ms"] is None else f"{summary['best_ms'] / 1000:.3f}"
+        self.best_label.configure(text=f"Best: {best} ({summary['wins']}/{summary['games']})")
+
     def reset(self):
         """Reset the game state."""
+        self.game.finish_recording()
         self.game.grid.reset_all_cells()  # Call the grid reset method
         self.game.reset_game()
         self.update_flags()
         self.update_timer()
+        self.update_best()
+
+    def change_mode(self, width):
+        """Adapt the topbar to a new board size."""
+        self.configure(width=width)
+        self.max_flag = self.game.mines_count
+        self.update_flags()
+        self.update_best()
 
     def show_menu(self, event):
         """Show the context menu on right-click."""
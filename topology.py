@@ -0,0 +1,260 @@
+import sys
+from array import array
+from collections import OrderedDict
+
+# Board topologies
+SQUARE = "square"
+# Square cells whose edges wrap around, every cell has 8 neighbors
+TORUS = "torus"
+# Hexagonal cells in offset rows, odd rows shifted right by half a cell
+HEX = "hex"
+TOPOLOGIES = (SQUARE, TORUS, HEX)
+
+# Neighborhoods as (dy, dx) offsets, the cell included. Square cells keep the column by
+# column order of the former loops, which decides how chords cascade and so must not change.
+_SQUARE_OFFSETS = tuple((dy, dx) for dx in (-1, 0, 1) for dy in (-1, 0, 1))
+# Hex neighborhoods by row parity
+_HEX_OFFSETS = (
+    ((-1, -1), (-1, 0), (0, -1), (0, 0), (0, 1), (1, -1), (1, 0)),
+    ((-1, 0), (-1, 1), (0, -1), (0, 0), (0, 1), (1, 0), (1, 1)),
+)
+
+# Bytes per entry of the tables
+_LANE = array("i").itemsize
+
+# Bytes of neighbor tables kept for later boards of the same shape, about 40 per cell
+MAX_TABLE_BYTES = 64 << 20
+# Square and torus boards up to this many cells, e.g. the presets, read their neighbors
+# from tables too, which is faster than computing them; larger ones hold no tables
+MAX_TABLED_CELLS = 1 << 16
+
+# Topologies with tables by (width, height, kind), shared by every board of the same shape
+_cache = OrderedDict()
+
+
+class Topology:
+    def __init__(self, width, height, kind=SQUARE):
+        """
+        Describe the neighborhoods of a board shape. Hex neighborhoods, and those of
+        boards of at most MAX_TABLED_CELLS cells, are read from tables in CSR form,
+        built on first use: the neighbors of cell i are indices[starts[i]:starts[i + 1]],
+        the cell itself included. Other square and torus neighborhoods are computed
+        from the coordinates, so large boards hold no tables.
+        :param width: Number of cells along the x axis
+        :param height: Number of cells along the y axis
+        :param kind: SQUARE, TORUS or HEX
+        """
+        if kind not in TOPOLOGIES:
+            raise ValueError(f"Unknown topology {kind!r}")
+        if kind == TORUS and (width < 3 or height < 3):
+            raise ValueError("A torus needs at least 3 cells along each axis")
+        self.width = width
+        self.height = height
+        self.size = width * height
+        self.kind = kind
+        self.wraps = kind == TORUS
+        self.tabled = kind == HEX or self.size <= MAX_TABLED_CELLS
+        self._starts = None
+        self._indices = None
+
+    @property
+    def starts(self):
+        if self._starts is None:
+            self._build()
+        return self._starts
+
+    @property
+    def indices(self):
+        if self._indices is None:
+            self._build()
+        return self._indices
+
+    @property
+    def nbytes(self):
+        """Bytes held by the tables, 0 until they are built."""
+        if self._indices is None:
+            return 0
+        return (len(self._indices) + len(self._starts)) * _LANE
+
+    def _build(self):
+        """Build the CSR tables, row by row."""
+        self._starts = array("i", [0])
+        self._indices = array("i")
+        # Packed interior blocks by neighborhood shape, see _add_row
+        templates = {}
+        for y in range(self.height):
+            self._add_row(y, templates)
+
+    def _offsets(self, y):
+        """Return the (dy, dx) neighborhood offsets of the cells of a row."""
+        if self.kind == HEX:
+            return _HEX_OFFSETS[y & 1]
+        return _SQUARE_OFFSETS
+
+    def _add_row(self, y, templates):
+        """
+        Append the neighborhoods of a row. The cells whose neighborhood is not cut
+        by the left or right edge form one interleaved block, and rows with the same
+        neighborhood shape have the same block shifted by a multiple of the width.
+        The block of the first such row is kept as one integer with a lane per entry,
+        so later rows are a single addition instead of a loop over their cells.
+        Only the few cells at the edges are built one by one.
+        :param y: Row to append
+        :param templates: Blocks already built, by neighborhood shape
+        """
+        width, height = self.width, self.height
+        offsets = []
+        for dy, dx in self._offsets(y):
+            ny = y + dy
+            if self.wraps:
+                ny %= height
+            elif not 0 <= ny < height:
+                continue
+            offsets.append((ny * width, dx))
+
+        min_dx = min(dx for _, dx in offsets)
+        max_dx = max(dx for _, dx in offsets)
+        first = min(max(0, -min_dx), width)
+        last = max(first, width - max(0, max_dx))
+
+        for x in range(first):
+            self._add_cell(x, offsets)
+        count = len(offsets)
+        cells = last - first
+        if cells:
+            key = tuple((row - y * width, dx) for row, dx in offsets)
+            template = templates.get(key)
+            if template is None:
+                block = array("i", bytes(_LANE * count * cells))
+                for slot, (row, dx) in enumerate(offsets):
+                    block[slot::count] = array("i", range(row + first + dx, row + last + dx))
+                starts = array("i", range(count, count * cells + 1, count))
+                template = templates[key] = (
+                    y, _pack(block), _pack(starts), _ones(count * cells), _ones(cells)
+                )
+            template_y, block, starts, block_ones, starts_ones = template
+            block += (y - template_y) * width * block_ones
+            starts += self._starts[-1] * starts_ones
+            self._indices.frombytes(block.to_bytes(_LANE * count * cells, sys.byteorder))
+            self._starts.frombytes(starts.to_bytes(_LANE * cells, sys.byteorder))
+        for x in range(last, width):
+            self._add_cell(x, offsets)
+
+    def _add_cell(self, x, offsets):
+        """Append the neighborhood of a single cell, wrapping or clipping its columns."""
+        width = self.width
+        for row, dx in offsets:
+            nx = x + dx
+            if self.wraps:
+                nx %= width
+            elif not 0 <= nx < width:
+                continue
+            self._indices.append(row + nx)
+        self._starts.append(len(self._indices))
+
+    def neighbors(self, index):
+        """Return the flat indices of the neighborhood of a cell, the cell included."""
+        if self.tabled:
+            starts = self.starts
+            return self.indices[starts[index]:starts[index + 1]]
+        width, height = self.width, self.height
+        y, x = divmod(index, width)
+        if 0 < x < width - 1 and 0 < y < height - 1:
+            # Inside the edges, the same on square and torus boards
+            above, below = index - width, index + width
+            return [above - 1, index - 1, below - 1, above, index, below, above + 1, index + 1, below + 1]
+        if self.wraps:
+            columns = ((x - 1) % width, x, (x + 1) % width)
+            rows = ((y - 1) % height * width, y * width, (y + 1) % height * width)
+        else:
+            columns = [nx for nx in (x - 1, x, x + 1) if 0 <= nx < width]
+            rows = [ny * width for ny in (y - 1, y, y + 1) if 0 <= ny < height]
+        # Column by column, in the order of _SQUARE_OFFSETS
+        return [row + column for column in columns for row in rows]
+
+    def count_around(self, flags):
+        """
+        Count the set cells in the neighborhood of every cell.
+        Square and torus boards use the shifted-sum pass of Board, padding the
+        border with zeros or with the opposite edge; hex boards add each set cell
+        to its neighborhood, which is the same as counting since it is symmetric.
+        :param flags: Bytes-like object of board size, 1 for the cells to count
+        :return: Bytearray of board size
+        """
+        width, height = self.width, self.height
+        if self.kind == HEX:
+            counts = bytearray(self.size)
+            indices, starts = self.indices, self.starts
+            position = flags.find(1)
+            while position >= 0:
+                for neighbor in indices[starts[position]:starts[position + 1]]:
+                    counts[neighbor] += 1
+                position = flags.find(1, position + 1)
+            return counts
+
+        stride = width + 2
+        rows = [flags[y * width:(y + 1) * width] for y in range(height)]
+        if self.wraps:
+            padded_rows = [row[-1:] + row + row[:1] for row in rows]
+            padded = b"".join([padded_rows[-1]] + padded_rows + [padded_rows[0]])
+        else:
+            border = bytes(stride)
+            padded = b"".join([border] + [b"\0" + row + b"\0" for row in rows] + [border])
+        return count_padded(padded, width, height)
+
+
+def count_padded(padded, width, height):
+    """
+    Count the set cells in the 3x3 block of every cell of a padded grid, in one
+    pass: the grid is read as a single integer of one byte per cell, summed with
+    itself shifted by one cell, then by one row, and no sum reaches 9.
+    :param padded: Bytes of (width + 2) x (height + 2) cells, 1 for the cells to count,
+        the grid surrounded by a border of the cells around it
+    :param width: Width of the grid inside the border
+    :param height: Height of the grid inside the border
+    :return: Bytearray of width x height counts, row by row
+    """
+    stride = width + 2
+    packed = int.from_bytes(padded, "little")
+    row_sums = packed + (packed << 8) + (packed >> 8)
+    boxes = row_sums + (row_sums << (8 * stride)) + (row_sums >> (8 * stride))
+    counts = boxes.to_bytes(len(padded) + stride + 1, "little")
+    return bytearray(b"".join(
+        counts[(y + 1) * stride + 1:(y + 1) * stride + 1 + width] for y in range(height)
+    ))
+
+
+def _pack(entries):
+    """Pack an array of table entries into one integer, a lane of _LANE bytes per entry."""
+    return int.from_bytes(entries.tobytes(), sys.byteorder)
+
+
+def _ones(count):
+    """Return an integer with a 1 in each of count lanes, to add a constant to every entry."""
+    return int.from_bytes(array("i", [1]).tobytes() * count, sys.byteorder)
+
+
+def get_topology(width, height, kind=SQUARE):
+    """
+    Return the topology of a board shape. Topologies with tables are shared by the
+    boards of the same shape, keeping the most recently used ones while their tables
+    take no more than MAX_TABLE_BYTES; the others hold no tables and are not shared.
+    """
+    key = (width, height, kind)
+    topology = _cache.get(key)
+    if topology is None:
+        topology = Topology(width, height, kind)
+        if not topology.tabled:
+            return topology
+        _cache[key] = topology
+    else:
+        _cache.move_to_end(key)
+    # Tables are built after a topology is returned, so they are counted on the next call
+    while len(_cache) > 1 and sum(cached.nbytes for cached in _cache.values()) > MAX_TABLE_BYTES:
+        _cache.popitem(last=False)
+    return topology
+
+
+def clear_topologies():
+    """Drop the cached tables, e.g. after playing on very large boards."""
+    _cache.clear()